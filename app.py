@@ -1,71 +1,50 @@
 import streamlit as st
 import pandas as pd
-import docx
-import fitz  # PyMuPDF for PDFs
-import re
-import gspread
-from google.oauth2 import service_account
+import os
+import copy
+import logging
+import multiprocessing
 from io import BytesIO
-from review_interface import ReviewInterface, SuggestedFix
-from spellchecker import SpellChecker
-import textblob
-from docx import Document
-from collections import Counter
+from importlib.machinery import ModuleSpec
+from review_interface import ReviewInterface, SuggestedFix, build_report_pdf
+from client_rules import RULE_COLUMNS, get_compiled_rules, load_client_rules, rules_revision
+from text_index import TextIndex
+from tone import DEFAULT_WINDOW_WORDS, analyze_tone
+from pos_tagging import tag_document
+from sentiment import sentiment_score
+from extraction import Extraction, extract_docx, extract_pdf
+from phrase_matcher import Rule
+from scan_cache import MISSING, ArtifactCache, artifact_key, content_hash
+from settings import CACHE_DIR, get_setting
+from task_graph import run_task_graph
+from spelling import get_spell_checker, spelling_suggestions, hyphenated_suggestions
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 import nltk
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.tag import pos_tag
-from nltk.corpus import wordnet
-
-# Download required NLTK data if not already present
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('taggers/averaged_perceptron_tagger')
-    nltk.data.find('corpora/wordnet')
-except LookupError:
-    nltk.download('punkt', quiet=True)
-    nltk.download('averaged_perceptron_tagger', quiet=True)
-    nltk.download('wordnet', quiet=True)
-    nltk.download('omw-1.4', quiet=True)
-
-# --- Display functions moved to global scope ---
-def display_results(issues, review_interface):
-    """Display the results in an organized manner"""
-    if not issues:
-        st.success("No issues found!")
-        return
-
-    # Group issues by type
-    issues_by_type = {}
-    for issue in issues:
-        category = issue.issue_type.split(":")[0].strip()  # Get main category
-        if category not in issues_by_type:
-            issues_by_type[category] = []
-        issues_by_type[category].append(issue)
-
-    # Display issues by category
-    for category in ['Spelling', 'Banned Phrase', 'American Spelling', 'Em Dash Usage']:
-        # Create a unique key for each expander
-        expander_key = f"expander_{category}"
-        
-        # Update expander state based on user interaction
-        with st.expander(f"{category} ({len(issues_by_type.get(category, []))} issues)", 
-                        expanded=False) as exp:
-            display_category_issues(issues_by_type.get(category, []), category, review_interface)
-
-def display_category_issues(issues, category, review_interface):
-    """Display issues for a specific category"""
-    if not issues:
-        st.write("No issues found in this category.")
-        return
-
-    for i, issue in enumerate(issues):
-        # Use id(issue) for uniqueness
-        issue_key = f"{category}_{i}_{id(issue)}"
-        st.markdown(f"**Original:** {issue.original_text}")
-        review_interface.render_fix(issue, i, issue_key)
-        st.markdown("---")
-# --- End of display functions ---
+
+# Download the NLTK tagger data if not already present (pos_tagging is the
+# only NLTK user). Once per process, not on every rerun.
+@st.cache_resource(show_spinner=False)
+def ensure_nltk_data():
+    # NLTK 3.9+ loads the "_eng" name; older versions the plain one
+    for name in ('averaged_perceptron_tagger', 'averaged_perceptron_tagger_eng'):
+        try:
+            nltk.data.find(f'taggers/{name}')
+        except LookupError:
+            nltk.download(name, quiet=True)
+
+ensure_nltk_data()
+
+# Debug output from the checks goes through logging (set log_level = "DEBUG")
+logging.basicConfig(level=get_setting("log_level", "WARNING"))
+logger = logging.getLogger("copy_checker")
+
+# Streamlit runs this script as a bare `__main__` module, and spawned worker
+# processes re-run the main module from its file unless it has a spec named
+# `__main__`. The extraction workers only need the extraction module, so
+# don't let them run the whole app.
+__spec__ = ModuleSpec("__main__", None)
 
 # === UI SETUP ===
 # Load the thumbnail image
@@ -114,308 +93,9 @@ if check_password():
     st.title("📝 RN Copy Checker")
 
     # Initialize tools
-    review_interface = ReviewInterface()
-    spell = SpellChecker()
-
-    # Define formal and informal word lists
-    formal_words = {
-        'therefore', 'furthermore', 'consequently', 'nevertheless', 'however',
-        'moreover', 'thus', 'hence', 'accordingly', 'subsequently',
-        'demonstrate', 'indicate', 'suggest', 'propose', 'conclude',
-        'implement', 'utilize', 'facilitate', 'establish', 'determine'
-    }
-
-    informal_words = {
-        'like', 'just', 'maybe', 'kind of', 'sort of', 'lots', 'stuff',
-        'thing', 'pretty', 'really', 'very', 'totally', 'basically',
-        'actually', 'literally', 'awesome', 'amazing', 'cool', 'huge',
-        'okay', 'ok', 'yeah', 'hey', 'guys'
-    }
-
-    descriptive_words = {
-        'detailed', 'comprehensive', 'thorough', 'extensive', 'in-depth',
-        'specific', 'precise', 'explicit', 'clear', 'vivid', 'elaborate',
-        'nuanced', 'meticulous', 'rigorous', 'exhaustive'
-    }
-
-    def score_descriptiveness(text, word_count):
-        """
-        Calculate descriptiveness score based on adjectives, adverbs, sensory language, and figurative language.
-        Returns a score between 0 and 100.
-        """
-        if not text or word_count == 0:
-            return 0.0
-        
-        # Sensory and emotive adjectives/adverbs (weighted higher)
-        sensory_emotive_words = {
-            # Visual
-            'golden', 'vivid', 'bright', 'brilliant', 'gleaming', 'shimmering', 'radiant', 
-            'dazzling', 'luminous', 'glowing', 'sparkling', 'crystalline', 'translucent',
-            'shadowy', 'gloomy', 'dim', 'murky', 'hazy', 'blurred', 'sharp', 'crisp',
-            
-            # Tactile
-            'smooth', 'rough', 'silky', 'velvety', 'coarse', 'tender', 'soft', 'hard',
-            'warm', 'cool', 'freezing', 'burning', 'sticky', 'slippery', 'dry', 'moist',
-            
-            # Auditory
-            'thunderous', 'whispered', 'melodic', 'harsh', 'gentle', 'piercing', 'muffled',
-            'resonant', 'echoing', 'silent', 'deafening', 'rhythmic', 'harmonious',
-            
-            # Olfactory/Gustatory
-            'fragrant', 'aromatic', 'pungent', 'sweet', 'bitter', 'sour', 'fresh', 'stale',
-            'savory', 'spicy', 'bland', 'rich', 'delicate', 'robust',
-            
-            # Emotional/Atmospheric
-            'serene', 'tranquil', 'chaotic', 'peaceful', 'turbulent', 'mysterious',
-            'enchanting', 'haunting', 'melancholy', 'joyful', 'somber', 'vibrant',
-            'dramatic', 'subtle', 'intense', 'gentle', 'fierce', 'delicate',
-            
-            # Adverbs
-            'gracefully', 'effortlessly', 'dramatically', 'gently', 'fiercely', 'subtly',
-            'vividly', 'brilliantly', 'mysteriously', 'elegantly', 'powerfully', 'tenderly'
-        }
-        
-        # Figurative language patterns
-        simile_patterns = [
-            r'\blike\s+a\b', r'\bas\s+\w+\s+as\b', r'\blike\s+\w+ing\b'
-        ]
-        
-        metaphor_indicators = {
-            'bathed', 'drenched', 'flooded', 'swept', 'embraced', 'kissed', 'caressed',
-            'whispered', 'sang', 'danced', 'painted', 'carved', 'sculpted', 'woven'
-        }
-        
-        # Tokenize and get POS tags
-        try:
-            tokens = word_tokenize(text.lower())
-            pos_tags = pos_tag(tokens)
-        except:
-            # Fallback to simple tokenization if NLTK fails
-            tokens = tokenize_text(text)
-            pos_tags = [(token, 'UNKNOWN') for token in tokens]
-        
-        # Count adjectives and adverbs
-        adjective_count = 0
-        adverb_count = 0
-        sensory_count = 0
-        
-        for word, pos in pos_tags:
-            # Count adjectives (JJ, JJR, JJS)
-            if pos.startswith('JJ'):
-                adjective_count += 1
-                # Weight sensory/emotive adjectives higher
-                if word in sensory_emotive_words:
-                    sensory_count += 2
-            # Count adverbs (RB, RBR, RBS)
-            elif pos.startswith('RB'):
-                adverb_count += 1
-                # Weight sensory/emotive adverbs higher
-                if word in sensory_emotive_words:
-                    sensory_count += 2
-            # Check for metaphor indicators
-            elif word in metaphor_indicators:
-                sensory_count += 1
-        
-        # Count figurative language
-        figurative_count = 0
-        text_lower = text.lower()
-        
-        # Count similes
-        for pattern in simile_patterns:
-            figurative_count += len(re.findall(pattern, text_lower))
-        
-        # Calculate base descriptiveness from adjectives/adverbs per 100 words
-        base_descriptiveness = ((adjective_count + adverb_count) / word_count) * 100
-        
-        # Add bonus for sensory/emotive language
-        sensory_bonus = (sensory_count / word_count) * 50
-        
-        # Add bonus for figurative language
-        figurative_bonus = (figurative_count / word_count) * 30
-        
-        # Combine scores with diminishing returns
-        total_score = base_descriptiveness + sensory_bonus + figurative_bonus
-        
-        # Apply scaling to make scores more intuitive
-        if total_score > 0:
-            # Use a more generous scaling that rewards descriptive writing
-            total_score = min(100, 30 * (1 + 2.5 * (total_score / 100) ** 0.6))
-        
-        return max(0, min(100, total_score))
-
-    def score_formality(text, all_words, word_count):
-        """
-        Calculate formality score based on contractions, informal vocabulary, 
-        exclamations, pronouns, and formal language patterns.
-        Returns a score between 0 and 100.
-        """
-        if not text or word_count == 0:
-            return 50.0
-        
-        # Expanded informal vocabulary
-        informal_vocabulary = {
-            # Casual words
-            'like', 'just', 'maybe', 'kinda', 'sorta', 'gonna', 'gotta', 'wanna',
-            'lots', 'stuff', 'thing', 'things', 'pretty', 'really', 'very', 'super',
-            'totally', 'basically', 'actually', 'literally', 'honestly', 'seriously',
-            'awesome', 'amazing', 'cool', 'huge', 'tiny', 'massive', 'epic',
-            'okay', 'ok', 'yeah', 'yep', 'nope', 'hey', 'guys', 'folks',
-            'crazy', 'insane', 'wild', 'sick', 'sweet', 'dope', 'rad',
-            'whatever', 'anyways', 'dunno', 'lemme', 'gimme'
-        }
-        
-        # Interjections and exclamatory words
-        interjections = {
-            'wow', 'oh', 'ah', 'ugh', 'hmm', 'oops', 'yay', 'hooray',
-            'alas', 'darn', 'gosh', 'jeez', 'phew', 'whoa', 'bam', 'boom'
-        }
-        
-        # Formal/business vocabulary (rewards formality)
-        formal_vocabulary = {
-            'regarding', 'concerning', 'pertaining', 'submit', 'forthcoming', 'pursuant',
-            'heretofore', 'henceforth', 'notwithstanding', 'nevertheless', 'furthermore',
-            'consequently', 'therefore', 'accordingly', 'subsequently', 'moreover',
-            'demonstrate', 'indicate', 'suggest', 'propose', 'conclude', 'establish',
-            'implement', 'utilize', 'facilitate', 'determine', 'ascertain', 'endeavor',
-            'commence', 'terminate', 'acquire', 'procure', 'obtain', 'maintain',
-            'substantial', 'significant', 'considerable', 'appropriate', 'adequate',
-            'sufficient', 'comprehensive', 'extensive', 'preliminary', 'subsequent'
-        }
-        
-        # Personal pronouns (context-dependent penalty)
-        personal_pronouns = {'i', 'you', 'we', 'me', 'us', 'my', 'your', 'our'}
-        
-        # Count various formality indicators
-        contraction_count = 0
-        informal_count = 0
-        interjection_count = 0
-        exclamation_count = 0
-        formal_count = 0
-        personal_pronoun_count = 0
-        
-        # Count contractions
-        contraction_patterns = [
-            r"\b\w+'\w+\b",  # General contractions like don't, can't, you're
-            r"\b\w+'ll\b",   # will contractions
-            r"\b\w+'ve\b",   # have contractions
-            r"\b\w+'re\b",   # are contractions
-            r"\b\w+'d\b",    # would/had contractions
-        ]
-        
-        for pattern in contraction_patterns:
-            contraction_count += len(re.findall(pattern, text, re.IGNORECASE))
-        
-        # Count exclamation marks
-        exclamation_count = text.count('!')
-        
-        # Count word-based indicators
-        for word in all_words:
-            if word in informal_vocabulary:
-                informal_count += 1
-            elif word in interjections:
-                interjection_count += 1
-            elif word in formal_vocabulary:
-                formal_count += 1
-            elif word in personal_pronouns:
-                personal_pronoun_count += 1
-        
-        # Calculate penalty factors (higher = less formal)
-        contraction_penalty = (contraction_count / word_count) * 100
-        informal_penalty = (informal_count / word_count) * 80
-        interjection_penalty = (interjection_count / word_count) * 60
-        exclamation_penalty = (exclamation_count / word_count) * 40
-        pronoun_penalty = (personal_pronoun_count / word_count) * 20
-        
-        # Calculate reward factors (higher = more formal)
-        formal_reward = (formal_count / word_count) * 60
-        
-        # Base formality score starts at 50 (neutral)
-        formality_score = 50.0
-        
-        # Apply penalties
-        total_penalty = contraction_penalty + informal_penalty + interjection_penalty + exclamation_penalty + pronoun_penalty
-        formality_score -= total_penalty
-        
-        # Apply rewards
-        formality_score += formal_reward
-        
-        # Ensure score stays within bounds
-        return max(0, min(100, formality_score))
-
-    def tokenize_text(text):
-        """
-        A robust tokenizer that splits text into a list of words, 
-        preserving contractions and hyphenated words, while ignoring standalone punctuation.
-        Returns a list of all words (with duplicates).
-        """
-        # Normalize text to lowercase
-        text = text.lower()
-        # This regex finds sequences of letters that can be optionally separated by an apostrophe or hyphen.
-        # The regex has been corrected to handle hyphens properly.
-        words = re.findall(r"[a-z]+(?:['\-][a-z]+)*", text)
-        return words
-
-    def simple_sentence_split(text):
-        """More robust sentence splitting using regex."""
-        if not text:
-            return []
-        # This regex splits the text after a sentence-ending punctuation mark (. ! ?)
-        # that is followed by a space or a newline. The regex has been corrected
-        # to look for whitespace (\s) instead of a literal backslash.
-        sentences = re.split(r'(?<=[.!?])\s+', text.strip())
-        # Filter out any empty strings that might result.
-        return [s for s in sentences if s]
-
-    def analyze_tone(text):
-        """
-        Analyzes the tone of the text with corrected and robust logic.
-        """
-        # If the input text is empty or just whitespace, return a zeroed-out dictionary.
-        if not text or not text.strip():
-            return {
-                'formality': 50.0, 'descriptiveness': 0.0, 'sentiment': 50.0,
-                'avg_sentence_length': 0.0, 'vocabulary_richness': 0.0,
-                'word_count': 0, 'sentence_count': 0
-            }
-
-        # --- 1. Core Counts (Words and Sentences) ---
-        all_words = tokenize_text(text)
-        word_count = len(all_words)
-        
-        sentences = simple_sentence_split(text)
-        sentence_count = len(sentences)
-
-        # If there are no words or sentences, we can't calculate ratios.
-        if word_count == 0 or sentence_count == 0:
-            return {
-                'formality': 50.0, 'descriptiveness': 0.0, 'sentiment': 50.0,
-                'avg_sentence_length': 0.0, 'vocabulary_richness': 0.0,
-                'word_count': word_count, 'sentence_count': sentence_count
-            }
-
-        # --- 2. Richness and Length Metrics ---
-        unique_word_count = len(set(all_words))
-        vocabulary_richness = (unique_word_count / word_count) * 100
-        avg_sentence_length = word_count / sentence_count
-
-        # --- 3. Content-Based Metrics ---
-        # Use new improved scoring functions
-        formality_score = score_formality(text, all_words, word_count)
-        descriptiveness_score = score_descriptiveness(text, word_count)
-        
-        # Sentiment score: uses TextBlob's polarity, scaled to 0-100.
-        blob = textblob.TextBlob(text)
-        sentiment = (blob.sentiment.polarity + 1) / 2 * 100 # Scale from -1:1 to 0:100
-
-        return {
-            'formality': formality_score,
-            'descriptiveness': descriptiveness_score,
-            'sentiment': sentiment,
-            'avg_sentence_length': avg_sentence_length,
-            'vocabulary_richness': vocabulary_richness,
-            'word_count': word_count,
-            'sentence_count': sentence_count
-        }
+    # Decisions also refresh the document versions fragment
+    review_interface = ReviewInterface(linked_fragments=("document_versions",))
+    spell = get_spell_checker()  # Shared across sessions, with cached suggestions
 
     def render_tone_analysis(metrics):
         """Render the tone analysis metrics"""
@@ -489,6 +169,46 @@ if check_password():
         
         The average sentence length of {metrics['avg_sentence_length']:.1f} words is {'quite long' if metrics['avg_sentence_length'] > 20 else 'moderate' if metrics['avg_sentence_length'] > 15 else 'concise'}.
         """)
+        
+        render_tone_profile(metrics)
+
+    def render_tone_profile(metrics):
+        """How formality and descriptiveness change through the document"""
+        windows = metrics.get('windows') or []
+        sections = metrics.get('sections') or []
+        if len(windows) < 2 and len(sections) < 2:
+            return  # Too short to vary
+        
+        st.markdown("### 📈 Tone Through the Document")
+        if len(windows) > 1:
+            chart = pd.DataFrame(
+                {
+                    "Formality": [w['formality'] for w in windows],
+                    "Descriptiveness": [w['descriptiveness'] for w in windows],
+                },
+                index=pd.Index([w['first_word'] for w in windows], name="Word"),
+            )
+            st.line_chart(chart, height=220)
+            st.caption(f"Each point covers {metrics['window_words']} words, starting at the word shown")
+        
+        if len(sections) > 1:
+            most = max(sections, key=lambda section: section['formality'])
+            least = min(sections, key=lambda section: section['formality'])
+            st.markdown(
+                f"Most formal: **{most['label']}** ({most['formality']:.1f}%) · "
+                f"least formal: **{least['label']}** ({least['formality']:.1f}%)"
+            )
+            with st.expander(f"Tone by section ({len(sections)} sections)", expanded=False):
+                st.dataframe(
+                    pd.DataFrame({
+                        "Section": [section['label'] for section in sections],
+                        "Words": [section['words'] for section in sections],
+                        "Formality %": [round(section['formality'], 1) for section in sections],
+                        "Descriptiveness %": [round(section['descriptiveness'], 1) for section in sections],
+                    }),
+                    hide_index=True,
+                    use_container_width=True
+                )
 
     # === STEP 1: UPLOAD FILE ===
     uploaded_file = st.file_uploader(
@@ -497,302 +217,469 @@ if check_password():
         help="Select a Word (.docx) or PDF (.pdf) file to analyze"
     )
 
-    # === STEP 2: LOAD CLIENT RULES FROM GOOGLE SHEETS ===
-    def load_client_rules():
-        # Uses credentials from Streamlit secrets
-        creds = service_account.Credentials.from_service_account_info(
-            st.secrets["gcp_service_account"],
-            scopes=["https://www.googleapis.com/auth/spreadsheets.readonly"]
-        )
-        client = gspread.authorize(creds)
-        sheet = client.open_by_url("https://docs.google.com/spreadsheets/d/1VJ7Ox1MNVkWx4nTaVW4ifoYWcKb4eq7GovgpLNX4wfo/edit")
-        worksheet = sheet.get_worksheet(0)
-        data = worksheet.get_all_records()
-        df = pd.DataFrame(data)
-        return df
-
+    # === STEP 2: LOAD CLIENT RULES (Google Sheet, CSV or offline snapshot) ===
     try:
         client_df = load_client_rules()
         client_names = client_df["Client"].unique().tolist()
     except Exception as e:
-        st.error(f"Error loading Google Sheet: {str(e)}")
+        st.error(f"Error loading client rules: {str(e)}")
         st.error("Using fallback client list.")
+        client_df = pd.DataFrame(columns=RULE_COLUMNS)
         client_names = ["AL4L", "Demo Client"]
 
     selected_client = st.selectbox("Optional: Select a client for custom rules", ["None"] + client_names)
 
     # === STEP 3: EXTRACT TEXT ===
-    def extract_text(file):
-        """Extract text from supported file types"""
+    @st.cache_resource(show_spinner=False)
+    def get_extract_pool():
+        """Worker processes for extracting large PDFs, shared by every session.
+
+        Workers are spawned fresh rather than forked: forking the server
+        would copy it mid-flight, with its scan threads, rules refresh and
+        event loop (and any locks they hold) frozen in the child.
+        """
+        return ProcessPoolExecutor(
+            max_workers=get_setting("extract_workers", os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def extract_text(file, on_chunk=None):
+        """Extract text from supported file types.
+
+        PDFs are extracted page by page and DOCX files are streamed from the
+        zip (body, tables, text boxes, headers, footers and notes);
+        `on_chunk` receives each piece of text as soon as it is available.
+        """
         if not file:
-            return ""
+            return Extraction("", None)
         
         if file.name.endswith(".docx"):
-            doc = docx.Document(file)
-            return "\n".join([p.text for p in doc.paragraphs])
+            return extract_docx(file, on_chunk)
         elif file.name.endswith(".pdf"):
-            pdf = fitz.open(stream=file.read(), filetype="pdf")
-            text = "\n".join([page.get_text() for page in pdf])
-            pdf.close()
-            return text
+            workers = get_setting("extract_workers", os.cpu_count() or 1)
+            return extract_pdf(
+                file.read(), on_chunk,
+                executor=get_extract_pool() if workers > 1 else None,
+                workers=workers,
+                parallel_min_pages=get_setting("parallel_extract_min_pages", 40)
+            )
         else:
             st.error(f"Unsupported file type. Please upload a .docx or .pdf file.")
-            return ""
+            return Extraction("", None)
 
     # === STEP 4: RUN BASE CHECKS (universal) ===
-    def run_base_checks(text):
+    banned_phrases = {
+        "world-class": "leading, premier, exceptional",
+        "innovative": "advanced, pioneering, groundbreaking",
+        "cutting-edge": "advanced, modern, state-of-the-art",
+        "best-in-class": "leading, superior, outstanding",
+        "industry-leading": "prominent, distinguished, renowned",
+        "game-changing": "transformative, revolutionary, groundbreaking",
+        "revolutionary": "transformative, innovative, pioneering",
+        "next-generation": "advanced, modern, enhanced",
+        "state-of-the-art": "modern, advanced, cutting-edge"
+    }
+    
+    # American vs British spelling pairs
+    spelling_pairs = {
+        "color": "colour",
+        "center": "centre",
+        "analyze": "analyse",
+        "organize": "organise",
+        # Add more pairs as needed
+    }
+    
+    base_rules = tuple(
+        Rule(phrase, suggestions, "Banned Phrase", "base")
+        for phrase, suggestions in banned_phrases.items()
+    ) + tuple(
+        Rule(am, br, "American Spelling", "American spelling")
+        for am, br in spelling_pairs.items()
+    )
+    
+    # Client rules compiled once per rules revision, each client's banned words
+    # sharing one automaton with the base rules
+    compiled_rules = get_compiled_rules(rules_revision(client_df), base_rules, client_df)
+
+
+    def page_at(offsets, start):
+        """Page number for an issue, if the document has pages"""
+        return offsets.page_of(start) if offsets is not None else None
+
+    def rule_issue(text, offsets, match):
+        """Turn a rule hit into a suggested fix"""
+        return SuggestedFix(
+            issue_type=match.rule.issue_type,
+            original_text=text[match.start:match.end],
+            suggested_text=match.rule.suggestion,
+            start=match.start,
+            end=match.end,
+            page=page_at(offsets, match.start)
+        )
+
+    def run_base_checks(text, index, offsets, rule_matches):
         """Run base checks including spelling, grammar, banned phrases, and em dash usage"""
         issues = []
         
         # Spell check
-        words = tokenize_text(text)
+        words = set(index.vocabulary())
         # Don't spell check contractions
-        words_to_check = [word for word in words if "'" not in word]
+        words_to_check = {word for word in words if "'" not in word}
         # Don't spell check hyphenated words as a whole, but check their parts
-        hyphenated_parts = []
-        for word in words_to_check[:]:
-            if '-' in word:
-                words_to_check.remove(word)
-                parts = word.split('-')
-                hyphenated_parts.extend(parts)
-                # Only check the word if any of its parts are misspelled
-                misspelled_parts = spell.unknown(parts)
-                if misspelled_parts:
-                    pattern = re.compile(r'\b' + re.escape(word) + r'\b', re.IGNORECASE)
-                    matches = list(pattern.finditer(text))
-                    
-                    for match in matches:
-                        word_index = match.start()
-                        start = max(0, word_index - 50)
-                        end = min(len(text), word_index + len(word) + 50)
-                        context = f"...{text[start:end]}..."
-                        
-                        # Get suggestions for misspelled parts
-                        suggestions_by_part = {}
-                        for part in misspelled_parts:
-                            suggestions = spell.candidates(part)
-                            if suggestions:
-                                suggestions_by_part[part] = list(suggestions)[:3]
-                        
-                        # Format suggestions
-                        suggestion_text = "Possible issues in parts: " + ", ".join(
-                            f"{part}: {', '.join(suggs)}"
-                            for part, suggs in suggestions_by_part.items()
-                        )
-                        
-                        issues.append(SuggestedFix(
-                            issue_type="Spelling (Hyphenated Word)",
-                            original_text=match.group(),
-                            suggested_text=suggestion_text,
-                            context=context
-                        ))
+        hyphenated_parts = set()
+        for word in [w for w in words_to_check if '-' in w]:
+            words_to_check.discard(word)
+            parts = word.split('-')
+            hyphenated_parts.update(parts)
+            # Only check the word if any of its parts are misspelled
+            misspelled_parts = spell.unknown(parts)
+            if misspelled_parts:
+                # Suggestions for the misspelled parts are only worked out
+                # when the fix is first shown or exported
+                suggest = partial(hyphenated_suggestions, tuple(sorted(misspelled_parts)))
+                for start, end in index.token_spans(word):
+                    issues.append(SuggestedFix(
+                        issue_type="Spelling (Hyphenated Word)",
+                        original_text=text[start:end],
+                        suggested_text=None,
+                        suggest=suggest,
+                        start=start,
+                        end=end,
+                        page=page_at(offsets, start)
+                    ))
         
         # Add hyphenated parts back to the words to check
-        words_to_check.extend(hyphenated_parts)
+        words_to_check.update(hyphenated_parts)
         misspelled = spell.unknown(words_to_check)
         
         for word in misspelled:
             # Skip parts that are already handled in hyphenated words
             if word in hyphenated_parts:
                 continue
-                
-            # Find the word in context (using word boundaries)
-            pattern = re.compile(r'\b' + re.escape(word) + r'\b', re.IGNORECASE)
-            matches = list(pattern.finditer(text))
             
-            for match in matches:
-                word_index = match.start()
-                start = max(0, word_index - 50)
-                end = min(len(text), word_index + len(word) + 50)
-                context = f"...{text[start:end]}..."
-                
-                # Get suggestions
-                suggestions = spell.candidates(word)
-                if suggestions:
-                    suggestions_str = ", ".join(list(suggestions)[:3])  # Take top 3 suggestions
-                else:
-                    suggestions_str = "No suggestions available"
-                
+            # Suggestions are computed on demand, not during the scan
+            suggest = partial(spelling_suggestions, word)
+            for start, end in index.spans(word):
                 issues.append(SuggestedFix(
                     issue_type="Spelling",
-                    original_text=match.group(),  # Use the actual matched text to preserve case
-                    suggested_text=suggestions_str,
-                    context=context
+                    original_text=text[start:end],  # Use the actual text to preserve case
+                    suggested_text=None,
+                    suggest=suggest,
+                    start=start,
+                    end=end,
+                    page=page_at(offsets, start)
                 ))
         
-        # Check banned phrases
-        banned_phrases = {
-            "world-class": "leading, premier, exceptional",
-            "innovative": "advanced, pioneering, groundbreaking",
-            "cutting-edge": "advanced, modern, state-of-the-art",
-            "best-in-class": "leading, superior, outstanding",
-            "industry-leading": "prominent, distinguished, renowned",
-            "game-changing": "transformative, revolutionary, groundbreaking",
-            "revolutionary": "transformative, innovative, pioneering",
-            "next-generation": "advanced, modern, enhanced",
-            "state-of-the-art": "modern, advanced, cutting-edge"
-        }
+        # Banned phrases and American spellings come from the shared rule scan
+        for match in rule_matches:
+            if match.rule.source in ("base", "American spelling"):
+                issues.append(rule_issue(text, offsets, match))
         
-        for phrase, suggestions in banned_phrases.items():
-            if phrase in text.lower():
-                pattern = re.compile(re.escape(phrase), re.IGNORECASE)
-                for match in pattern.finditer(text):
-                    original = match.group()
-                    start = max(0, match.start() - 50)
-                    end = min(len(text), match.end() + 50)
-                    context = f"...{text[start:end]}..."
-                    
-                    issues.append(SuggestedFix(
-                        issue_type="Banned Phrase",
-                        original_text=original,
-                        suggested_text=suggestions,
-                        context=context
-                    ))
-        
-        # Check for American vs British spelling
-        blob = textblob.TextBlob(text)
-        # Add specific word pairs to check
-        spelling_pairs = {
-            "color": "colour",
-            "center": "centre",
-            "analyze": "analyse",
-            "organize": "organise",
-            # Add more pairs as needed
-        }
-        
-        for am, br in spelling_pairs.items():
-            pattern = re.compile(r'\b' + re.escape(am) + r'\b', re.IGNORECASE)
-            for match in pattern.finditer(text):
-                original = match.group()
-                start = max(0, match.start() - 50)
-                end = min(len(text), match.end() + 50)
-                context = f"...{text[start:end]}..."
-                
-                issues.append(SuggestedFix(
-                    issue_type="American Spelling",
-                    original_text=original,
-                    suggested_text=br,
-                    context=context
-                ))
-        
-        # Check for em dashes
-        em_dash_matches = list(re.finditer(r'\u2014|\u2013', text))  # Match both em and en dashes
-        for match in em_dash_matches:
-            start = max(0, match.start() - 50)
-            end = min(len(text), match.end() + 50)
-            context = f"...{text[start:end]}..."
-            
+        # Check for em dashes (both em and en dashes are recorded by the index)
+        for start, end in index.dashes:
             issues.append(SuggestedFix(
                 issue_type="Em Dash Usage",
-                original_text=match.group(),
+                original_text=text[start:end],
                 suggested_text=" , | ; | - ",  # Add spaces around each option
-                context=context
+                start=start,
+                end=end,
+                page=page_at(offsets, start)
             ))
         
         return issues
 
     # === STEP 5: RUN CLIENT CHECKS (if selected) ===
-    def run_client_checks(text, client_df, selected_name):
+    def run_client_checks(text, index, offsets, rule_matches, selected_name):
         issues = []
         
-        # Get all rows for the selected client
-        client_rows = client_df[client_df["Client"] == selected_name]
-        
-        # Debug print
-        print(f"\nProcessing rules for client: {selected_name}")
-        print(f"Found {len(client_rows)} rules")
-        print(f"Text to check: {text[:200]}...")  # Print first 200 chars of text
+        for match in rule_matches:
+            if match.rule.source != selected_name:
+                continue
+            fix = rule_issue(text, offsets, match)
+            logger.debug("Found match: '%s' -> '%s'", fix.original_text, fix.suggested_text)
+            issues.append(fix)
         
-        for _, row in client_rows.iterrows():
-            # Split both banned words and replacements, and normalize them
-            banned_words = []
-            replacements = []
-            
-            # Handle banned words
-            raw_banned = str(row.get("Banned Words", "")).strip()
-            if raw_banned:
-                banned_words = [word.strip() for word in raw_banned.split(",") if word.strip()]
-                print(f"\nRaw banned words: {raw_banned}")
-                print(f"Processed banned words: {banned_words}")
-            
-            # Handle replacements
-            raw_replacements = str(row.get("Suggested Replacements", "")).strip()
-            if raw_replacements:
-                replacements = [word.strip() for word in raw_replacements.split(",") if word.strip()]
-                print(f"Raw replacements: {raw_replacements}")
-                print(f"Processed replacements: {replacements}")
-            
-            # Create a mapping of banned words to their replacements
-            word_mapping = {}
-            for i, banned_word in enumerate(banned_words):
-                # If there's a corresponding replacement, use it; otherwise use a default
-                replacement = replacements[i] if i < len(replacements) else "[NEEDS REPLACEMENT]"
-                word_mapping[banned_word] = replacement
-            
-            print(f"\nWord mapping: {word_mapping}")
-            
-            # Process each banned word with its specific replacement
-            for banned_word, replacement in word_mapping.items():
-                # Create pattern with optional capitalization
-                pattern = re.compile(fr'\b{re.escape(banned_word)}\b', re.IGNORECASE)
-                
-                # Find all matches
-                matches = list(pattern.finditer(text))
-                print(f"\nChecking for word: '{banned_word}'")
-                print(f"Pattern used: {pattern.pattern}")
-                print(f"Found {len(matches)} matches")
-                
-                for match in matches:
-                    original = match.group()
-                    start = max(0, match.start() - 50)
-                    end = min(len(text), match.end() + 50)
-                    context = f"...{text[start:end]}..."
-                    
-                    print(f"Found match: '{original}' -> '{replacement}'")
-                    print(f"Context: {context}")
-                    
-                    # Create the fix with proper initialization
-                    fix = SuggestedFix(
-                        issue_type=f"Client ({selected_name}) Banned Word",
-                        original_text=original,
-                        suggested_text=replacement,
-                        context=context
-                    )
-                    issues.append(fix)
-        
-        print(f"\nTotal issues found: {len(issues)}")
+        logger.debug("Client %s: %d issues found", selected_name, len(issues))
         return issues
 
     # === STEP 6: PROCESS FILE AND SHOW RESULTS ===
+    # Bump a stage's version whenever its output changes for the same input,
+    # so stale artifacts are not read back from the cache
+    STAGE_VERSIONS = {"extract": 3, "index": 5, "tone": 8, "base": 4, "client": 4}
+
+    @st.cache_resource(show_spinner=False)
+    def get_artifact_cache():
+        """Scan artifacts on local disk, shared by every session"""
+        max_mb = get_setting("scan_cache_max_mb", 512)
+        return ArtifactCache(CACHE_DIR / "artifacts", max_mb * 1024 * 1024)
+
+    @st.cache_resource(show_spinner=False)
+    def get_scan_executor():
+        """Worker threads for scan stages, shared by every session"""
+        return ThreadPoolExecutor(max_workers=get_setting("scan_workers", 4), thread_name_prefix="scan")
+
+    def scan_document(uploaded_file, file_hash, selected_client, on_stage_done):
+        """Run the copy check, reusing cached stage outputs.
+
+        Once the text is extracted, tone analysis, base checks and client
+        checks run concurrently. `on_stage_done(stage, result)` is called on
+        the script thread as each of "text", "tone", "base_issues" and
+        "client_issues" finishes. Returns the extracted text.
+        """
+        cache = get_artifact_cache()
+        source = (file_hash, Path(uploaded_file.name).suffix.lower(), STAGE_VERSIONS["extract"])
+        index_key = artifact_key(*source, STAGE_VERSIONS["index"])
+        
+        # Everything else depends on the text, so extract it up front. When
+        # it isn't cached, each page is tokenized as soon as it is extracted
+        # instead of after the whole document has been read.
+        extraction = cache.get("text", artifact_key(*source))
+        streamed_index = None
+        if extraction is MISSING:
+            streamed_index = TextIndex()
+            uploaded_file.seek(0)
+            extraction = extract_text(uploaded_file, on_chunk=streamed_index.extend)
+            streamed_index.finish()
+            cache.put("text", artifact_key(*source), extraction)
+            if extraction.text:
+                cache.put("index", index_key, streamed_index)
+        text, offsets = extraction
+        if not text:
+            return text
+        on_stage_done("text", text)
+        
+        base_key = artifact_key(
+            *source, STAGE_VERSIONS["base"], spell.cache.dictionary_version, base_rules
+        )
+        client_key = artifact_key(
+            *source, STAGE_VERSIONS["client"], selected_client, compiled_rules.revision
+        )
+        matcher = compiled_rules.matcher_for(selected_client).matcher
+        tone_window = get_setting("tone_window_words", DEFAULT_WINDOW_WORDS)
+        
+        def base_stage(index, rule_matches):
+            return run_base_checks(text, index, offsets, rule_matches)
+        
+        def client_stage(index, rule_matches):
+            if selected_client == "None":
+                return []
+            return run_client_checks(text, index, offsets, rule_matches, selected_client)
+        
+        tasks = {
+            # Tokenize once; every check looks up occurrences in this index
+            "index": ((), lambda: streamed_index if streamed_index is not None else cache.get_or_compute(
+                "index", index_key, lambda: TextIndex(text)
+            )),
+        }
+        tone_key = artifact_key(*source, STAGE_VERSIONS["tone"], tone_window)
+        tone = cache.get("tone", tone_key)
+        if tone is MISSING:
+            # Tagged once per scan (and cached per sentence across scans);
+            # any check needing parts of speech can depend on this stage
+            tasks["pos_tags"] = (("index",), tag_document)
+            # Scored from the same tokens, alongside the tagging
+            tasks["sentiment"] = (("index",), sentiment_score)
+            tasks["tone"] = (
+                ("index", "pos_tags", "sentiment"),
+                lambda index, tags, sentiment: cache.get_or_compute(
+                    "tone", tone_key, lambda: analyze_tone(text, index, offsets, tone_window, tags, sentiment)
+                ),
+            )
+        else:
+            tasks["tone"] = ((), lambda: tone)
+        base_issues = cache.get("base_issues", base_key)
+        client_issues = cache.get("client_issues", client_key)
+        if base_issues is MISSING or client_issues is MISSING:
+            # Find every banned phrase, American spelling and client banned
+            # word in one pass with the client's precompiled matcher
+            tasks["rule_matches"] = ((), lambda: matcher.find_all(text))
+        for stage, key, issues, check in (
+            ("base_issues", base_key, base_issues, base_stage),
+            ("client_issues", client_key, client_issues, client_stage),
+        ):
+            if issues is MISSING:
+                tasks[stage] = (
+                    ("index", "rule_matches"),
+                    lambda index, rule_matches, stage=stage, key=key, check=check:
+                        cache.get_or_compute(stage, key, lambda: check(index, rule_matches)),
+                )
+            else:
+                tasks[stage] = ((), lambda issues=issues: issues)
+        
+        def on_done(stage, result):
+            if stage in ("tone", "base_issues", "client_issues"):
+                on_stage_done(stage, result)
+        
+        run_task_graph(get_scan_executor(), tasks, on_done)
+        return text
+
+    def report_key():
+        """Identifies the report for the current decisions and tone metrics"""
+        metrics = st.session_state.get('tone_metrics')
+        return (review_interface.decision_state(), repr(sorted(metrics.items())) if metrics else None)
+
+    @st.fragment(run_every=1)
+    def wait_for_report():
+        """Poll the report build, reloading the page once it is ready"""
+        if st.session_state.report["future"].done():
+            st.rerun()
+        st.info("⏳ Building PDF report...")
+
+    def render_report_download():
+        """Offer the PDF report, building it on a worker thread when asked.
+
+        The finished report is kept until a decision changes, so reruns only
+        rebuild it if the user asks again after changing something.
+        """
+        key = report_key()
+        report = st.session_state.get('report')
+        if report is not None and report["key"] == key:
+            if not report["future"].done():
+                wait_for_report()
+                return
+            try:
+                report_bytes = report["future"].result()
+            except Exception as e:
+                st.error(f"Error building the PDF report: {str(e)}")
+                del st.session_state.report
+                return
+            st.download_button(
+                "📊 Download Full Report (PDF)",
+                report_bytes,
+                "copy_check_report.pdf",
+                "application/pdf",
+                key="download_report",
+                help="Download a detailed PDF report of all changes and decisions"
+            )
+            return
+        
+        if st.button(
+            "📊 Prepare Full Report (PDF)",
+            key="prepare_report",
+            help="Build a detailed PDF report of all changes and decisions"
+        ):
+            # The worker gets its own copies, as the review UI keeps changing
+            # the fixes while the report is being built
+            fixes = [copy.copy(fix) for fix in st.session_state.fixes]
+            for fix in fixes:
+                fix.overrides = dict(fix.overrides)
+            st.session_state.report = {
+                "key": key,
+                "future": get_scan_executor().submit(
+                    build_report_pdf, fixes, st.session_state.get('tone_metrics'),
+                    st.session_state.original_text
+                ),
+            }
+            wait_for_report()
+
+    @st.fragment(key="document_versions")
+    def render_document_versions():
+        """Original, marked-up and clean text plus downloads. Reruns with
+        the review fragments whenever a decision is made."""
+        st.markdown("## Document Versions")
+
+        tab1, tab2, tab3 = st.tabs(["📄 Original", "🔍 Marked-up", "✨ Clean"])
+
+        with tab1:
+            st.markdown("### Original Document")
+            st.text_area(
+                "Original document content",
+                st.session_state.original_text,
+                height=300,
+                help="The original unmodified text"
+            )
+            st.download_button(
+                "📥 Download Original Text",
+                st.session_state.original_text,
+                "original_text.txt",
+                "text/plain",
+                key="download_original",
+                help="Download the original unmodified text as a .txt file"
+            )
+
+        with tab2:
+            st.markdown("### Marked-up Document")
+            marked_text = review_interface.generate_marked_document(st.session_state.original_text)
+            st.markdown(marked_text, unsafe_allow_html=True)
+            st.download_button(
+                "📥 Download Marked-up Version",
+                marked_text,
+                "marked_up_text.html",
+                "text/html",
+                key="download_marked",
+                help="Download the marked-up version with all changes highlighted as an HTML file"
+            )
+
+        with tab3:
+            st.markdown("### Clean Document")
+            clean_text = review_interface.generate_clean_document(st.session_state.original_text)
+            st.text_area(
+                "Clean document content",
+                clean_text,
+                height=300,
+                help="The clean text with all accepted changes applied"
+            )
+            st.download_button(
+                "📥 Download Clean Version",
+                clean_text,
+                "clean_text.txt",
+                "text/plain",
+                key="download_clean",
+                help="Download the clean version with all accepted changes as a .txt file"
+            )
+
+        # Add PDF report download (built on request, not on every rerun)
+        render_report_download()
+
     if uploaded_file is not None:
         if 'document_scanned' not in st.session_state:
             st.session_state.document_scanned = False
+        
+        # Re-scan when a different file or client is selected
+        file_hash = content_hash(uploaded_file.getvalue())
+        if st.session_state.get('scan_key') != (file_hash, selected_client):
+            st.session_state.document_scanned = False
             
         if not st.session_state.document_scanned:
-            with st.spinner("Scanning document..."):
+            with st.status("Scanning document...") as scan_status:
+                # A different client on the same document keeps the decisions
+                # already made on the issues both scans find
+                previous_scan = st.session_state.get('scan_key')
+                same_document = previous_scan is not None and previous_scan[0] == file_hash
+                saved_decisions = st.session_state.fixes.decisions() if same_document else {}
+
                 # Clear previous fixes
                 review_interface.clear_fixes()
                 
-                # Extract text
-                text = extract_text(uploaded_file)
-                if text:  # Only proceed if we have text
-                    st.session_state.original_text = text
-                    
-                    # Run tone analysis
-                    st.session_state.tone_metrics = analyze_tone(text)
-                    
-                    # Run checks
-                    base_issues = run_base_checks(text)
-                    for issue in base_issues:
-                        review_interface.add_fix(issue)
-                    
-                    if selected_client != "None":
-                        client_issues = run_client_checks(text, client_df, selected_client)
-                        for issue in client_issues:
+                stage_labels = {
+                    "text": "Text extracted",
+                    "tone": "Tone analysis complete",
+                    "base_issues": "Spelling and style checks complete",
+                    "client_issues": "Client checks complete",
+                }
+                
+                def on_stage_done(stage, result):
+                    """Store each stage's results as soon as they are ready"""
+                    if stage == "text":
+                        st.session_state.original_text = result
+                    elif stage == "tone":
+                        st.session_state.tone_metrics = result
+                    else:
+                        for issue in result:
                             review_interface.add_fix(issue)
-                            
+                    scan_status.write(f"✅ {stage_labels[stage]}")
+                
+                text = scan_document(uploaded_file, file_hash, selected_client, on_stage_done)
+                if text:  # Only proceed if we have text
                     st.session_state.document_scanned = True
+                    st.session_state.scan_key = (file_hash, selected_client)
+                    if saved_decisions:
+                        restored = st.session_state.fixes.restore_decisions(saved_decisions)
+                        if restored:
+                            scan_status.write(f"↩️ Kept {restored} earlier decisions")
+                    scan_status.update(label="Scan complete", state="complete", expanded=False)
                 else:
+                    scan_status.update(label="Scan failed", state="error")
                     st.error("No text could be extracted from the file. Please check the file and try again.")
                     st.session_state.document_scanned = False
         
@@ -801,76 +688,21 @@ if check_password():
         
         # Show review interface
         review_interface.render_interface()
+
+        # Spelling suggestions are worked out as their fixes are shown, so
+        # report the cache once the review page has rendered (when it changed)
+        suggestion_stats = spell.cache.stats()
+        if suggestion_stats != st.session_state.get('suggestion_stats'):
+            st.session_state.suggestion_stats = suggestion_stats
+            logger.debug(
+                "Suggestion cache: %(hits)d hits, %(misses)d misses, %(in_memory)d in memory",
+                suggestion_stats,
+            )
         
         # Show document versions and downloads
         if st.session_state.fixes:
-            st.markdown("## Document Versions")
-            
-            tab1, tab2, tab3 = st.tabs(["📄 Original", "🔍 Marked-up", "✨ Clean"])
-            
-            with tab1:
-                st.markdown("### Original Document")
-                st.text_area(
-                    "Original document content",
-                    st.session_state.original_text,
-                    height=300,
-                    key="original_text_display",
-                    help="The original unmodified text"
-                )
-                st.download_button(
-                    "📥 Download Original Text",
-                    st.session_state.original_text,
-                    "original_text.txt",
-                    "text/plain",
-                    key="download_original",
-                    help="Download the original unmodified text as a .txt file"
-                )
-            
-            with tab2:
-                st.markdown("### Marked-up Document")
-                marked_text = review_interface.generate_marked_document(st.session_state.original_text)
-                st.markdown(marked_text, unsafe_allow_html=True)
-                st.download_button(
-                    "📥 Download Marked-up Version",
-                    marked_text,
-                    "marked_up_text.html",
-                    "text/html",
-                    key="download_marked",
-                    help="Download the marked-up version with all changes highlighted as an HTML file"
-                )
-            
-            with tab3:
-                st.markdown("### Clean Document")
-                clean_text = review_interface.generate_clean_document(st.session_state.original_text)
-                st.text_area(
-                    "Clean document content",
-                    clean_text,
-                    height=300,
-                    key="clean_text",
-                    help="The clean text with all accepted changes applied"
-                )
-                st.download_button(
-                    "📥 Download Clean Version",
-                    clean_text,
-                    "clean_text.txt",
-                    "text/plain",
-                    key="download_clean",
-                    help="Download the clean version with all accepted changes as a .txt file"
-                )
-            
-            # Add PDF report download
-            report_bytes = review_interface.create_downloadable_report(st.session_state.original_text)
-            st.download_button(
-                "📊 Download Full Report (PDF)",
-                report_bytes,
-                "copy_check_report.pdf",
-                "application/pdf",
-                key="download_report",
-                help="Download a detailed PDF report of all changes and decisions"
-            )
+            render_document_versions()
 
-            # Display review sections
-            display_results(st.session_state.fixes, review_interface)
     else:
         # Reset the scan state when no file is uploaded
         if 'document_scanned' in st.session_state:
@@ -0,0 +1,331 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import gspread
+import pandas as pd
+import streamlit as st
+from google.oauth2 import service_account
+from gspread.utils import extract_id_from_url
+
+from phrase_matcher import PhraseMatcher, Rule
+from settings import CACHE_DIR, get_setting
+
+logger = logging.getLogger(__name__)
+
+SHEET_URL = "https://docs.google.com/spreadsheets/d/1VJ7Ox1MNVkWx4nTaVW4ifoYWcKb4eq7GovgpLNX4wfo/edit"
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets.readonly",
+    # Lets us read the sheet's modified time without downloading it
+    "https://www.googleapis.com/auth/drive.metadata.readonly",
+]
+RULE_COLUMNS = ["Client", "Banned Words", "Suggested Replacements"]
+SNAPSHOT_PATH = CACHE_DIR / "client_rules.sqlite3"
+
+
+class RulesSource(ABC):
+    """Somewhere client rules can be loaded from.
+
+    Rules are a DataFrame in the `google_sheet_template.csv` layout. A
+    revision is a cheap marker that changes whenever the rules do (None if
+    the source can't tell).
+    """
+
+    name = "rules source"
+
+    def revision(self) -> Optional[str]:
+        return None
+
+    @abstractmethod
+    def fetch(self) -> pd.DataFrame:
+        """The current rules"""
+
+
+class GoogleSheetSource(RulesSource):
+    """The client rules Google Sheet (first worksheet)"""
+
+    name = "Google Sheet"
+
+    def __init__(self, url: str):
+        self.key = extract_id_from_url(url)
+        self._client: Optional[gspread.Client] = None
+        self._lock = threading.Lock()
+
+    def client(self) -> gspread.Client:
+        """Authorized gspread client, reused for the life of the source"""
+        with self._lock:
+            if self._client is None:
+                # Uses credentials from Streamlit secrets
+                creds = service_account.Credentials.from_service_account_info(
+                    st.secrets["gcp_service_account"],
+                    scopes=SCOPES
+                )
+                self._client = gspread.authorize(creds)
+            return self._client
+
+    def revision(self) -> Optional[str]:
+        try:
+            return self.client().get_file_drive_metadata(self.key)["modifiedTime"]
+        except Exception:
+            # No metadata access: the sheet is downloaded every refresh
+            return None
+
+    def fetch(self) -> pd.DataFrame:
+        worksheet = self.client().open_by_key(self.key).get_worksheet(0)
+        return pd.DataFrame(worksheet.get_all_records())
+
+
+class CsvSource(RulesSource):
+    """A local CSV file in the `google_sheet_template.csv` layout"""
+
+    name = "CSV file"
+
+    def __init__(self, path: Path):
+        # Relative paths are relative to the app, not the working directory
+        self.path = Path(__file__).parent / path
+
+    def revision(self) -> Optional[str]:
+        stat = self.path.stat()
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def fetch(self) -> pd.DataFrame:
+        return pd.read_csv(self.path, dtype=str, keep_default_na=False)
+
+
+class SnapshotSource(RulesSource):
+    """A local sqlite copy of the last rules fetched from the Google Sheet"""
+
+    name = "offline snapshot"
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        return sqlite3.connect(str(self.path))
+
+    def revision(self) -> Optional[str]:
+        return self.load()[1]
+
+    def fetch(self) -> pd.DataFrame:
+        return self.load()[0]
+
+    def load(self) -> Tuple[pd.DataFrame, Optional[str]]:
+        """The snapshot rules and the revision they were saved at"""
+        # Connecting would create an empty database where there is none
+        if not self.exists():
+            raise FileNotFoundError(f"No client rules snapshot at {self.path}")
+        with self._connect() as db:
+            df = pd.read_sql_query("SELECT * FROM client_rules", db)
+            row = db.execute("SELECT revision FROM snapshot_meta").fetchone()
+        return df, row[0] if row else None
+
+    def save(self, df: pd.DataFrame, revision: Optional[str]):
+        with self._connect() as db:
+            df.to_sql("client_rules", db, if_exists="replace", index=False)
+            db.execute("CREATE TABLE IF NOT EXISTS snapshot_meta (revision TEXT, saved_at REAL)")
+            db.execute("DELETE FROM snapshot_meta")
+            db.execute("INSERT INTO snapshot_meta VALUES (?, ?)", (revision, time.time()))
+
+
+class RulesCache:
+    """Client rules from a RulesSource, cached for `ttl` seconds.
+
+    Once the TTL has passed, the source's revision is checked and the rules
+    are only fetched again if it changed, so an unchanged Google Sheet costs
+    one metadata request per TTL rather than a full download on every rerun.
+
+    With a snapshot (only for the Google Sheet, so local stand-ins never
+    overwrite the offline copy), every successful fetch is written to it.
+    When a snapshot exists,
+    reads never wait on the source: the first read is served from the
+    snapshot, and refreshes run on a background thread while the current rules
+    keep being served.
+    """
+
+    def __init__(self, source: RulesSource, ttl: float, snapshot: Optional[SnapshotSource] = None):
+        self.source = source
+        self.ttl = ttl
+        self.snapshot = snapshot
+        self.df: Optional[pd.DataFrame] = None
+        self.revision: Optional[str] = None
+        self.loaded_from: Optional[str] = None
+        self._checked_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def get(self) -> pd.DataFrame:
+        with self._lock:
+            if self.df is None and self.snapshot is not None and self.snapshot.exists():
+                try:
+                    self.df, self.revision = self.snapshot.load()
+                    self.loaded_from = self.snapshot.name
+                except Exception as e:
+                    logger.warning("Could not read client rules snapshot: %s", e)
+
+            if self.df is not None:
+                stale = time.monotonic() - self._checked_at >= self.ttl
+                if stale and not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._refresh_in_background, daemon=True).start()
+                return self.df
+
+        # Nothing to serve yet, so this first load has to wait for the source
+        self._refresh()
+        return self.df
+
+    def _refresh_in_background(self):
+        try:
+            self._refresh()
+        except Exception as e:
+            # Keep serving the last good copy and try again after the next TTL
+            logger.warning("Refreshing client rules from %s failed: %s", self.source.name, e)
+            self._checked_at = time.monotonic()
+        finally:
+            self._refreshing = False
+
+    def _refresh(self):
+        revision = self.source.revision()
+        if self.df is None or revision is None or revision != self.revision:
+            df = self.source.fetch()
+            with self._lock:
+                self.df = df
+                self.loaded_from = self.source.name
+            if self.snapshot is not None:
+                try:
+                    self.snapshot.save(df, revision)
+                except Exception as e:
+                    logger.warning("Could not write client rules snapshot: %s", e)
+        with self._lock:
+            self.revision = revision
+            self._checked_at = time.monotonic()
+
+
+def make_rules_source(name: str) -> RulesSource:
+    """Build the rules source named by the `rules_source` setting"""
+    if name == "sheet":
+        return GoogleSheetSource(SHEET_URL)
+    if name == "csv":
+        return CsvSource(get_setting("rules_csv_path", "google_sheet_template.csv"))
+    if name == "snapshot":
+        return SnapshotSource(SNAPSHOT_PATH)
+    raise ValueError(f"Unknown rules source '{name}'. Expected 'sheet', 'csv' or 'snapshot'")
+
+
+@st.cache_resource(show_spinner=False)
+def get_rules_cache(source_name: str, ttl: float) -> RulesCache:
+    """The process-wide rules cache shared by every session"""
+    source = make_rules_source(source_name)
+    # Only the Google Sheet is backed by the snapshot: a CSV or the snapshot
+    # itself is already local and must be served as-is
+    snapshot = SnapshotSource(SNAPSHOT_PATH) if isinstance(source, GoogleSheetSource) else None
+    return RulesCache(source, ttl, snapshot)
+
+
+def load_client_rules() -> pd.DataFrame:
+    """Client rules from the configured source (`rules_source`, default the
+    Google Sheet), cached for `rules_ttl_seconds` (default 5 minutes)"""
+    cache = get_rules_cache(
+        get_setting("rules_source", "sheet"),
+        get_setting("rules_ttl_seconds", 300),
+    )
+    return cache.get()
+
+
+def rules_revision(df: pd.DataFrame) -> str:
+    """Content fingerprint of a rules table, whatever source it came from"""
+    fingerprint = pd.util.hash_pandas_object(df.reindex(columns=RULE_COLUMNS), index=False)
+    return hashlib.sha256(fingerprint.values.tobytes()).hexdigest()
+
+
+def _split_column(rules: pd.DataFrame, column: str, name: str) -> pd.DataFrame:
+    """One row per comma-separated entry, numbered within its sheet row"""
+    items = rules[column].str.split(",").explode().str.strip()
+    items = items[items.notna() & (items != "")]
+    return pd.DataFrame({
+        "row": items.index,
+        "position": items.groupby(level=0).cumcount().to_numpy(),
+        name: items.to_numpy(),
+    })
+
+
+def compile_client_rules(client_df: pd.DataFrame) -> Dict[str, Tuple[Rule, ...]]:
+    """Banned-word rules for every client, in sheet order.
+
+    The n-th banned word in a row is paired with the n-th suggested
+    replacement in that row (or "[NEEDS REPLACEMENT]" if there isn't one).
+    """
+    if client_df.empty:
+        return {}
+    rules = client_df.reindex(columns=RULE_COLUMNS).fillna("").astype(str).reset_index(drop=True)
+
+    banned = _split_column(rules, "Banned Words", "banned")
+    replacements = _split_column(rules, "Suggested Replacements", "replacement")
+    pairs = banned.merge(replacements, on=["row", "position"], how="left")
+    pairs["replacement"] = pairs["replacement"].fillna("[NEEDS REPLACEMENT]")
+    pairs["client"] = rules["Client"].to_numpy()[pairs["row"].to_numpy()]
+    # A word listed twice in one row keeps its last replacement
+    pairs = pairs.drop_duplicates(subset=["row", "banned"], keep="last")
+
+    compiled: Dict[str, Tuple[Rule, ...]] = {}
+    for client, group in pairs.groupby("client", sort=False):
+        compiled[client] = tuple(
+            Rule(banned_word, replacement, f"Client ({client}) Banned Word", client)
+            for banned_word, replacement in zip(group["banned"], group["replacement"])
+        )
+    logger.debug("Compiled rules for %d clients", len(compiled))
+    return compiled
+
+
+@dataclass(frozen=True)
+class ClientMatcher:
+    """Compiled rules for one client: its banned words plus the base rules,
+    in a single automaton"""
+    client: str
+    rules: Tuple[Rule, ...]
+    matcher: PhraseMatcher
+
+
+class CompiledRules:
+    """Client rules compiled once per rules revision.
+
+    Per-client matchers are built the first time a client is selected and
+    reused by every later scan.
+    """
+
+    def __init__(self, revision: str, base_rules: Tuple[Rule, ...], client_df: pd.DataFrame):
+        self.revision = revision
+        self.base_rules = base_rules
+        self._client_rules = compile_client_rules(client_df)
+        self._matchers: Dict[str, ClientMatcher] = {}
+        self._lock = threading.Lock()
+
+    def rules_for(self, client: str) -> Tuple[Rule, ...]:
+        return self._client_rules.get(client, ())
+
+    def matcher_for(self, client: str) -> ClientMatcher:
+        """Matcher for the base rules plus `client`'s rules ("None" for base
+        rules only)"""
+        with self._lock:
+            if client not in self._matchers:
+                rules = self.rules_for(client)
+                logger.debug("Building matcher for %s with %d rules", client, len(rules))
+                self._matchers[client] = ClientMatcher(
+                    client, rules, PhraseMatcher(self.base_rules + rules)
+                )
+            return self._matchers[client]
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def get_compiled_rules(revision: str, base_rules: Tuple[Rule, ...], _client_df: pd.DataFrame) -> CompiledRules:
+    """Compiled rules for a rules revision, shared by every session"""
+    return CompiledRules(revision, base_rules, _client_df)
@@ -0,0 +1,355 @@
+import os
+import re
+import tempfile
+import zipfile
+from bisect import bisect_right
+from concurrent.futures import Executor, wait
+from typing import IO, Callable, Iterator, List, NamedTuple, Optional, Tuple, Union
+from xml.etree.ElementTree import iterparse
+
+import fitz  # PyMuPDF for PDFs
+
+# Pages and paragraphs are joined with a newline, as `extract_text` always has
+PAGE_SEPARATOR = "\n"
+PARAGRAPH_SEPARATOR = "\n"
+
+# Text is handed to `on_chunk` in pieces of about this many characters
+CHUNK_SIZE = 64 * 1024
+
+
+class PdfLocation(NamedTuple):
+    """Where a line of extracted text sits in a PDF (all numbers 1-based)"""
+    page: int
+    block: int
+    line: int
+
+
+class DocxLocation(NamedTuple):
+    """Where a run of extracted text sits in a DOCX file"""
+    part: str  # e.g. "word/document.xml", "word/header1.xml"
+    paragraph: int  # 1-based within the part
+    run: int  # 1-based within the paragraph (0 for the paragraph start)
+
+
+Location = Union[PdfLocation, DocxLocation]
+
+
+class OffsetMap:
+    """Maps character offsets in the extracted text back to where the text
+    came from in the source document.
+
+    Each entry marks the offset a line (PDF) or run (DOCX) starts at; an
+    offset belongs to the last entry starting at or before it.
+    """
+
+    def __init__(self):
+        self._starts: List[int] = []
+        self._locations: List[Location] = []
+
+    def add(self, offset: int, location: Location):
+        """Record that a line or run starts at `offset` (offsets must be
+        added in order)"""
+        self._starts.append(offset)
+        self._locations.append(location)
+
+    def locate(self, offset: int) -> Optional[Location]:
+        i = bisect_right(self._starts, offset) - 1
+        return self._locations[i] if i >= 0 else None
+
+    def page_of(self, offset: int) -> Optional[int]:
+        """Page number containing an offset, if the source has pages"""
+        location = self.locate(offset)
+        return getattr(location, "page", None)
+
+    def block_starts(self) -> List[int]:
+        """Offsets where each block of text starts: a PDF text block or a
+        DOCX paragraph"""
+        starts = []
+        previous = None
+        for offset, location in zip(self._starts, self._locations):
+            block = location[:2]  # (page, block) or (part, paragraph)
+            if block != previous:
+                starts.append(offset)
+                previous = block
+        return starts
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+
+class Extraction(NamedTuple):
+    """Text extracted from an uploaded file"""
+    text: str
+    offsets: Optional[OffsetMap]  # None when the format has no location info
+
+
+class PageText(NamedTuple):
+    """One page of PDF text, with where each of its lines starts"""
+    number: int  # 1-based
+    text: str
+    lines: List[Tuple[int, int, int]]  # (offset within page, block, line)
+
+
+def _page_text(page: "fitz.Page", number: int) -> PageText:
+    parts = []
+    lines = []
+    length = 0
+    block_no = 0
+    for block in page.get_text("dict")["blocks"]:
+        if block["type"] != 0:  # Image blocks have no text
+            continue
+        block_no += 1
+        for line_no, line in enumerate(block["lines"], start=1):
+            line_text = "".join(span["text"] for span in line["spans"]) + "\n"
+            lines.append((length, block_no, line_no))
+            parts.append(line_text)
+            length += len(line_text)
+    return PageText(number, "".join(parts), lines)
+
+
+def iter_pdf_pages(data: bytes) -> Iterator[PageText]:
+    """Extract a PDF one page at a time.
+
+    Page text is identical to ``page.get_text()``, but built from the page's
+    text blocks so every line's position is known. Only the current page's
+    layout is held in memory.
+    """
+    pdf = fitz.open(stream=data, filetype="pdf")
+    try:
+        for page_no, page in enumerate(pdf, start=1):
+            yield _page_text(page, page_no)
+    finally:
+        pdf.close()
+
+
+def pdf_page_count(data: bytes) -> int:
+    with fitz.open(stream=data, filetype="pdf") as pdf:
+        return pdf.page_count
+
+
+def _extract_page_range(path: str, first: int, last: int) -> List[PageText]:
+    """Pages `first` to `last` (0-based, exclusive) of the PDF at `path`.
+    Runs in a worker process."""
+    with fitz.open(path) as pdf:
+        return [_page_text(pdf[i], i + 1) for i in range(first, last)]
+
+
+def iter_pdf_pages_parallel(data: bytes, executor: Executor, workers: int,
+                            page_count: Optional[int] = None) -> Iterator[PageText]:
+    """Like `iter_pdf_pages`, but with page ranges extracted concurrently by
+    `executor` (a process pool).
+
+    The PDF is written to a temporary file once and every worker opens it
+    from there, rather than each being sent a copy of the upload. Pages are
+    still yielded in order, each range as soon as it and the ones before it
+    are done.
+    """
+    if page_count is None:
+        page_count = pdf_page_count(data)
+    # A few ranges per worker, so one slow range doesn't leave the rest idle
+    range_size = max(1, -(-page_count // (workers * 4)))
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(data)
+        path = f.name
+    futures = []
+    try:
+        futures = [
+            executor.submit(_extract_page_range, path, first, min(first + range_size, page_count))
+            for first in range(0, page_count, range_size)
+        ]
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+        # Workers may still be reading if we stopped early
+        wait(futures)
+        os.unlink(path)
+
+
+def extract_pdf(data: bytes, on_chunk: Callable[[str], None] = None,
+                executor: Optional[Executor] = None, workers: int = 1,
+                parallel_min_pages: int = 0) -> Extraction:
+    """Extract a PDF page by page, recording where every line came from.
+
+    `on_chunk` is called with each piece of text as soon as its page is
+    extracted (the pieces add up to the full text), so later stages can start
+    before the last page is read.
+
+    With a process pool `executor` and more than one worker, documents of at
+    least `parallel_min_pages` pages are extracted in parallel; smaller ones
+    stay serial, where starting the workers would cost more than it saves.
+    The text and offsets are the same either way.
+    """
+    pages = None
+    if executor is not None and workers > 1:
+        page_count = pdf_page_count(data)
+        if page_count >= parallel_min_pages:
+            pages = iter_pdf_pages_parallel(data, executor, workers, page_count)
+    if pages is None:
+        pages = iter_pdf_pages(data)
+
+    offsets = OffsetMap()
+    chunks: List[str] = []
+    length = 0
+    for page in pages:
+        chunk = page.text if page.number == 1 else PAGE_SEPARATOR + page.text
+        page_start = length + len(chunk) - len(page.text)
+        for line_offset, block_no, line_no in page.lines:
+            offsets.add(page_start + line_offset, PdfLocation(page.number, block_no, line_no))
+        if not page.lines:
+            # Keep blank pages locatable so later offsets don't report the
+            # previous page
+            offsets.add(page_start, PdfLocation(page.number, 0, 0))
+        chunks.append(chunk)
+        length += len(chunk)
+        if on_chunk:
+            on_chunk(chunk)
+    return Extraction("".join(chunks), offsets)
+
+
+# --- DOCX ---
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+# Run content that python-docx also turns into text
+_RUN_TEXT = {
+    f"{_W}tab": "\t",
+    f"{_W}ptab": "\t",
+    f"{_W}cr": "\n",
+    f"{_W}noBreakHyphen": "-",
+}
+_HEADER_FOOTER = re.compile(r"word/(header|footer)(\d*)\.xml")
+
+
+class DocxParagraph(NamedTuple):
+    """One paragraph of DOCX text, with where each of its runs starts"""
+    part: str
+    number: int  # 1-based within the part
+    text: str
+    runs: List[Tuple[int, int]]  # (offset within paragraph, run number)
+
+
+def docx_text_parts(names: List[str]) -> List[str]:
+    """Text-bearing parts of a DOCX package, body first"""
+    headers_footers = sorted(
+        (name for name in names if _HEADER_FOOTER.fullmatch(name)),
+        key=lambda name: (_HEADER_FOOTER.fullmatch(name).group(1) == "footer",
+                          int(_HEADER_FOOTER.fullmatch(name).group(2) or 0)),
+    )
+    notes = [name for name in ("word/footnotes.xml", "word/endnotes.xml") if name in names]
+    return ["word/document.xml"] + headers_footers + notes
+
+
+class _OpenParagraph:
+    """A paragraph whose end tag hasn't been reached yet"""
+    __slots__ = ("number", "parts", "runs", "run", "length")
+
+    def __init__(self, number: int):
+        self.number = number
+        self.parts: List[str] = []
+        self.runs: List[Tuple[int, int]] = []
+        self.run = 0  # Number of the current (or last) run
+        self.length = 0
+
+    def add_text(self, text: str):
+        if not self.runs or self.runs[-1][1] != self.run:
+            self.runs.append((self.length, self.run))
+        self.parts.append(text)
+        self.length += len(text)
+
+
+def _iter_part_paragraphs(part: str, xml: IO[bytes]) -> Iterator[DocxParagraph]:
+    """Paragraphs of one XML part, read incrementally.
+
+    Paragraphs inside text boxes sit inside a run of another paragraph, so
+    open paragraphs are kept on a stack and each one gets only its own text.
+    A text box is yielded before the paragraph it is anchored in.
+    """
+    stack: List[_OpenParagraph] = []
+    count = 0
+    skipping = 0  # Depth inside mc:Fallback, which repeats mc:Choice content
+    for event, elem in iterparse(xml, events=("start", "end")):
+        tag = elem.tag
+        if tag == _MC_FALLBACK:
+            skipping += 1 if event == "start" else -1
+            continue
+        if skipping:
+            continue
+
+        if event == "start":
+            if tag == f"{_W}p":
+                count += 1
+                stack.append(_OpenParagraph(count))
+            elif tag == f"{_W}r" and stack:
+                stack[-1].run += 1
+            continue
+
+        if tag == f"{_W}p":
+            paragraph = stack.pop()
+            yield DocxParagraph(part, paragraph.number, "".join(paragraph.parts), paragraph.runs)
+            if not stack:
+                elem.clear()  # Done with it; keeps memory flat on long documents
+            continue
+        # Text only counts inside a run (w:tab also defines tab stops in
+        # paragraph properties)
+        if not stack or stack[-1].run == 0:
+            continue
+        if tag == f"{_W}t":
+            text = elem.text or ""
+        elif tag == f"{_W}br":
+            # Only line breaks become text, not page or column breaks
+            text = "\n" if elem.get(f"{_W}type", "textWrapping") == "textWrapping" else ""
+        else:
+            text = _RUN_TEXT.get(tag, "")
+        if text:
+            stack[-1].add_text(text)
+
+
+def iter_docx_paragraphs(file: Union[str, IO[bytes]]) -> Iterator[DocxParagraph]:
+    """Every paragraph of a DOCX file, streamed straight from the zip.
+
+    Covers the body (including tables and text boxes), headers, footers,
+    footnotes and endnotes. Body paragraphs are all kept, empty or not, so
+    the body reads exactly as it is laid out; empty paragraphs in the other
+    parts (such as footnote separators) are skipped.
+    """
+    with zipfile.ZipFile(file) as package:
+        for part in docx_text_parts(package.namelist()):
+            with package.open(part) as xml:
+                for paragraph in _iter_part_paragraphs(part, xml):
+                    if paragraph.text or part == "word/document.xml":
+                        yield paragraph
+
+
+def extract_docx(file: Union[str, IO[bytes]], on_chunk: Callable[[str], None] = None) -> Extraction:
+    """Extract a DOCX file, recording the part, paragraph and run every piece
+    of text came from.
+
+    `on_chunk` is called with the text in pieces as it is read (the pieces
+    add up to the full text).
+    """
+    offsets = OffsetMap()
+    chunks: List[str] = []
+    pending: List[str] = []
+    pending_length = 0
+    length = 0
+    for paragraph in iter_docx_paragraphs(file):
+        piece = paragraph.text if not chunks else PARAGRAPH_SEPARATOR + paragraph.text
+        paragraph_start = length + len(piece) - len(paragraph.text)
+        offsets.add(paragraph_start, DocxLocation(paragraph.part, paragraph.number, 0))
+        for run_offset, run_no in paragraph.runs:
+            offsets.add(paragraph_start + run_offset, DocxLocation(paragraph.part, paragraph.number, run_no))
+        chunks.append(piece)
+        length += len(piece)
+        if on_chunk:
+            pending.append(piece)
+            pending_length += len(piece)
+            if pending_length >= CHUNK_SIZE:
+                on_chunk("".join(pending))
+                pending = []
+                pending_length = 0
+    if on_chunk and pending:
+        on_chunk("".join(pending))
+    return Extraction("".join(chunks), offsets)
@@ -0,0 +1,126 @@
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+
+class Rule(NamedTuple):
+    """A phrase to flag and what to suggest instead"""
+    phrase: str
+    suggestion: str
+    issue_type: str
+    source: str  # "base", "American spelling" or the client name
+
+
+class Match(NamedTuple):
+    """A rule hit in the document"""
+    start: int
+    end: int
+    rule: Rule
+
+
+class PhraseMatcher:
+    """Aho-Corasick automaton over a fixed set of rules.
+
+    All phrases are found in a single left-to-right pass over the text, so the
+    cost of a scan depends on the document length rather than the number of
+    rules. Matching is case-insensitive and only reports hits that sit on word
+    boundaries (like wrapping each phrase in ``\\b...\\b``).
+    """
+
+    def __init__(self, rules: Iterable[Rule]):
+        self.rules: Tuple[Rule, ...] = tuple(rules)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Node -> (phrase length, rule numbers) for every phrase ending there
+        self._output: List[List[Tuple[int, Tuple[int, ...]]]] = [[]]
+        self._build()
+
+    def _build(self):
+        endings: Dict[int, List[int]] = {}
+        for rule_no, rule in enumerate(self.rules):
+            phrase = _fold(rule.phrase.strip())
+            if not phrase:
+                continue
+            node = 0
+            for char in phrase:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                node = next_node
+            endings.setdefault(node, []).append(rule_no)
+
+        lengths = self._depths()
+        for node, rule_nos in endings.items():
+            self._output[node].append((lengths[node], tuple(rule_nos)))
+
+        # Breadth-first pass to set failure links and inherit the outputs of
+        # shorter phrases that end at the same position
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+                queue.append(child)
+
+    def _depths(self) -> List[int]:
+        depths = [0] * len(self._goto)
+        queue = deque([0])
+        while queue:
+            node = queue.popleft()
+            for child in self._goto[node].values():
+                depths[child] = depths[node] + 1
+                queue.append(child)
+        return depths
+
+    def find_all(self, text: str) -> List[Match]:
+        """Every word-bounded rule hit in the text, in document order"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        folded = _fold(text)
+
+        matches = []
+        node = 0
+        for i, char in enumerate(folded):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if not output[node]:
+                continue
+            end = i + 1
+            for length, rule_nos in output[node]:
+                start = end - length
+                if _is_bounded(text, start, end):
+                    for rule_no in rule_nos:
+                        matches.append(Match(start, end, self.rules[rule_no]))
+
+        matches.sort(key=lambda match: match.start)
+        return matches
+
+
+def _fold(text: str) -> str:
+    """Lowercase without changing the length, so offsets stay valid"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _is_bounded(text: str, start: int, end: int) -> bool:
+    if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(text[start]):
+        return False
+    if end < len(text) and _is_word_char(text[end]) and _is_word_char(text[end - 1]):
+        return False
+    return True
@@ -0,0 +1,107 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+from settings import get_setting
+from text_index import TextIndex
+
+logger = logging.getLogger(__name__)
+
+# Sentences are tagged in batches of this many
+BATCH_SIZE = 256
+
+
+class SentenceTagger:
+    """Part-of-speech tags for sentences, memoized per sentence (LRU).
+
+    Keyed by a hash of the sentence's words, so re-scanning an edited
+    document only tags the sentences that changed. Words are tagged as they
+    appear in the document: capitalization is part of what the tagger reads.
+    """
+
+    def __init__(self, tagger, max_sentences: int = 50000):
+        self.tagger = tagger
+        self.max_sentences = max_sentences
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[bytes, Tuple[str, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def sentence_key(words: Sequence[str]) -> bytes:
+        return hashlib.blake2b("\0".join(words).encode("utf-8"), digest_size=16).digest()
+
+    def tag_sentences(self, sentences: List[List[str]]) -> List[Tuple[str, ...]]:
+        """Tags for every word of every sentence"""
+        keys = [self.sentence_key(words) for words in sentences]
+        tags: List[Optional[Tuple[str, ...]]] = [None] * len(sentences)
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._memory.get(key)
+                if cached is not None:
+                    self._memory.move_to_end(key)
+                    tags[i] = cached
+            missing = [i for i, sentence_tags in enumerate(tags) if sentence_tags is None]
+            self.hits += len(sentences) - len(missing)
+            self.misses += len(missing)
+
+        for first in range(0, len(missing), BATCH_SIZE):
+            batch = missing[first:first + BATCH_SIZE]
+            tagged = self.tagger.tag_sents([sentences[i] for i in batch])
+            with self._lock:
+                for i, sentence in zip(batch, tagged):
+                    tags[i] = tuple(tag for _, tag in sentence)
+                    self._memory[keys[i]] = tags[i]
+                while len(self._memory) > self.max_sentences:
+                    self._memory.popitem(last=False)
+        return tags
+
+
+_tagger: Optional[SentenceTagger] = None
+_tagger_lock = threading.Lock()
+
+
+def get_tagger() -> SentenceTagger:
+    """The process-wide tagger shared by every Streamlit session. The
+    perceptron model is loaded once, on first use.
+
+    Raises LookupError if the NLTK tagger data isn't installed.
+    """
+    global _tagger
+    with _tagger_lock:
+        if _tagger is None:
+            from nltk.tag.perceptron import PerceptronTagger
+            _tagger = SentenceTagger(
+                PerceptronTagger(),
+                get_setting("pos_cache_sentences", 50000),
+            )
+        return _tagger
+
+
+def tag_document(index: TextIndex) -> Optional[List[str]]:
+    """Part-of-speech tag for every token of a document, tagged a sentence at
+    a time. None if no tagger is available.
+
+    Sentences end at sentence-ending punctuation, not at line breaks, so
+    wrapped PDF lines are tagged (and cached) as the sentence they belong to.
+
+    Any check that needs parts of speech can reuse the result (it is a stage
+    of the scan) instead of tagging the document again.
+    """
+    try:
+        tagger = get_tagger()
+    except LookupError:
+        logger.warning("POS tagging unavailable: the NLTK tagger data is not installed")
+        return None
+
+    text = index.text
+    sentences: List[List[str]] = []
+    current = None
+    for token in index.tokens:
+        if token.full_sentence != current:
+            sentences.append([])
+            current = token.full_sentence
+        sentences[-1].append(text[token.start:token.end])
+    return [tag for sentence_tags in tagger.tag_sentences(sentences) for tag in sentence_tags]
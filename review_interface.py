@@ -1,12 +1,15 @@
 import streamlit as st
 import pandas as pd
+from array import array
+from bisect import bisect_left, insort
 from dataclasses import dataclass, field
-from typing import List, Dict
+from typing import Callable, Iterator, List, Dict, NamedTuple, Optional, Sequence
 import difflib
 import re
 from fpdf import FPDF
 import html
 import base64
+from settings import get_setting
 
 class PDF(FPDF):
     """Custom PDF class to handle Unicode characters"""
@@ -49,56 +52,102 @@ class PDF(FPDF):
         self.cell(0, 10, text, ln=True)
         self.set_text_color(0, 0, 0)  # Reset to black
 
+# Decision on an issue or one of its occurrences
+ACCEPTED, REJECTED, PENDING = "accepted", "rejected", "pending"
+# Every decision, each with its own index in FixStore
+STATUSES = (PENDING, ACCEPTED, REJECTED)
+
+# Review filter: status name -> decision shown (None for all)
+REVIEW_STATUSES = {
+    "Pending": PENDING,
+    "Accepted": ACCEPTED,
+    "Rejected": REJECTED,
+    "All": None,
+}
+PAGE_SIZES = [10, 20, 50, 100]
+# Review fragments that show decisions and rerun whenever one is made
+DECISION_FRAGMENTS = ("review_counters", "review_summary")
+# Per-occurrence choice -> override (None follows the issue's decision)
+OCCURRENCE_CHOICES = {"As issue": None, "Accept": ACCEPTED, "Reject": REJECTED}
+DEFAULT_PAGE_SIZE = get_setting("review_page_size", 20)
+# Widgets render_fix draws for every fix, keyed "<prefix><fix key>"; their
+# state belongs to one document's fixes
+FIX_WIDGET_PREFIXES = (
+    "use_custom_", "custom_", "replacement_", "capitalize_",
+    "accept_", "reject_", "undo_", "occurrences_", "occurrence_",
+)
+
+def _first_page():
+    """Go back to the first page when the review filters change"""
+    st.session_state.pop('review_page', None)
+
+class Occurrence(NamedTuple):
+    """One place an issue appears in the original text"""
+    start: int
+    end: int
+    page: Optional[int] = None
+
+def _escape_text(text: str) -> str:
+    """Document text as HTML, keeping its line breaks"""
+    return html.escape(text).replace("\n", "<br>")
+
 @dataclass
 class SuggestedFix:
     issue_type: str
     original_text: str
-    suggested_text: str
-    context: str
-    accepted: bool = False
-    rejected: bool = False
+    suggested_text: Optional[str]  # None until computed by `suggest`
+    # Surrounding text; only stored for fixes without offsets, the rest
+    # slice it from the document on demand (see get_context)
+    context: Optional[str] = None
+    # ACCEPTED/REJECTED/PENDING; only FixStore.set_status changes it, so the
+    # store's indexes and counts always agree with it (see `status`)
+    _status: str = PENDING
     capitalize: bool = False  # Track capitalization
     _selected_replacement: str = ""  # Private storage for selected replacement
+    # Computes suggested_text the first time it is needed (rendering or export)
+    suggest: Optional[Callable[[], str]] = field(default=None, repr=False, compare=False)
+    # Where the issue is in the original text (text[start:end] == original_text)
+    start: Optional[int] = None
+    end: Optional[int] = None
+    page: Optional[int] = None  # Page the issue is on (PDFs only)
+    # Every place the same issue appears (the first is start/end above), so
+    # one fix is reviewed for all of them
+    occurrences: List[Occurrence] = field(default_factory=list)
+    # Occurrence number -> ACCEPTED/REJECTED/PENDING, overriding the fix's
+    # own decision for that occurrence only
+    overrides: Dict[int, str] = field(default_factory=dict)
 
     def __post_init__(self):
-        """Initialize the selected_replacement with the first suggestion"""
+        if not self.occurrences and self.start is not None:
+            self.occurrences = [Occurrence(self.start, self.end, self.page)]
+
+    def _default_replacement(self) -> str:
+        """The first suggestion, in the form it replaces the original text"""
+        suggested_text = self.get_suggested_text()
         # Special handling for em dash replacements
         if self.issue_type == "AI Pattern: Em Dash Usage":
-            suggestions = [s.strip() for s in self.suggested_text.split('|')]
-            self._selected_replacement = suggestions[0] if suggestions else self.suggested_text
+            suggestions = [s.strip() for s in suggested_text.split('|')]
+            replacement = suggestions[0] if suggestions else suggested_text
         # For patterns that don't need replacements, use original text
         elif self.issue_type in ["AI Pattern: Repetitive Sentence Structure", 
                                "AI Pattern: Business Cliché",
                                "AI Pattern: Long Sentences"]:
-            self._selected_replacement = self.original_text
+            replacement = self.original_text
         # Normal handling for other cases
         else:
-            suggestions = [s.strip() for s in self.suggested_text.split(',')]
-            self._selected_replacement = suggestions[0] if suggestions else self.suggested_text
+            suggestions = [s.strip() for s in suggested_text.split(',')]
+            replacement = suggestions[0] if suggestions else suggested_text
         
         if self.capitalize or self.original_text[0].isupper():
-            self._selected_replacement = self._selected_replacement.capitalize()
+            replacement = replacement.capitalize()
+        return replacement
 
     @property
     def selected_replacement(self) -> str:
-        """Get the current selected replacement"""
+        """Get the current selected replacement (the first suggestion until
+        one is chosen, worked out on first use)"""
         if not self._selected_replacement:
-            # Special handling for em dash replacements
-            if self.issue_type == "AI Pattern: Em Dash Usage":
-                suggestions = [s.strip() for s in self.suggested_text.split('|')]
-                self._selected_replacement = suggestions[0] if suggestions else self.suggested_text
-            # For patterns that don't need replacements, use original text
-            elif self.issue_type in ["AI Pattern: Repetitive Sentence Structure", 
-                                   "AI Pattern: Business Cliché",
-                                   "AI Pattern: Long Sentences"]:
-                self._selected_replacement = self.original_text
-            # Normal handling for other cases
-            else:
-                suggestions = [s.strip() for s in self.suggested_text.split(',')]
-                self._selected_replacement = suggestions[0] if suggestions else self.suggested_text
-            
-            if self.capitalize or self.original_text[0].isupper():
-                self._selected_replacement = self._selected_replacement.capitalize()
+            self._selected_replacement = self._default_replacement()
         return self._selected_replacement
 
     @selected_replacement.setter
@@ -108,14 +157,235 @@ class SuggestedFix:
         if self.capitalize or self.original_text[0].isupper():
             self._selected_replacement = self._selected_replacement.capitalize()
 
+    def get_suggested_text(self) -> str:
+        """Get the suggestions, computing and memoizing them on first use"""
+        if self.suggested_text is None:
+            self.suggested_text = self.suggest() if self.suggest else ""
+            self.suggest = None
+        return self.suggested_text
+
+    def get_context(self, text: str, width: int = 50) -> str:
+        """Surrounding text for the fix, as shown in the review UI. `text` is
+        the document the fix's offsets refer to."""
+        if self.context is not None or self.start is None:
+            return self.context or ""
+        return f"...{text[max(0, self.start - width):min(len(text), self.end + width)]}..."
+
     def get_selected_replacement(self) -> str:
         """Get the current selected replacement (legacy method)"""
         return self.selected_replacement
 
-class ReviewInterface:
+    def group_key(self) -> tuple:
+        """Fixes with the same key are the same issue and are reviewed
+        together. Capitalized and lowercase occurrences are kept apart so one
+        replacement fits every occurrence in a group. Lazy suggestions depend
+        only on the word, which is already part of the key."""
+        return (
+            self.issue_type,
+            self.original_text.lower(),
+            self.original_text[:1].isupper(),
+            self.suggested_text,
+        )
+
+    def add_occurrences(self, other: "SuggestedFix"):
+        """Merge another fix for the same issue into this one"""
+        self.occurrences.extend(other.occurrences)
+
+    @property
+    def status(self) -> str:
+        """Decision on the fix as a whole (read-only: decide through the
+        FixStore)"""
+        return self._status
+
+    @property
+    def accepted(self) -> bool:
+        return self._status == ACCEPTED
+
+    @property
+    def rejected(self) -> bool:
+        return self._status == REJECTED
+
+    def occurrence_status(self, number: int) -> str:
+        """Decision for one occurrence: its override, or the fix's own"""
+        return self.overrides.get(number, self.status)
+
+    @property
+    def pages(self) -> List[int]:
+        """Pages the issue appears on (PDFs only)"""
+        return sorted({occurrence.page for occurrence in self.occurrences if occurrence.page})
+
+class FixStore:
+    """The fixes under review, with the columns the review UI filters, counts
+    and builds documents from kept alongside them as arrays.
+
+    Per fix: its interned issue type and its decision as a status code (the
+    decision is mirrored, read-only, on the fix; only `set_status` changes
+    either). Per occurrence: its offsets and the fix it belongs to. Each
+    status keeps a sorted index of its fixes, derived from the status
+    column, and the totals are kept up to date as fixes are added and
+    decided, so counts are O(1) and a status filter only visits the fixes it
+    matches.
+    """
+
     def __init__(self):
+        self._fixes: List[SuggestedFix] = []
+        self._groups: Dict[tuple, int] = {}  # group_key -> fix number
+        self.types: List[str] = []  # Issue types in the order first seen
+        self._type_codes: Dict[str, int] = {}
+        # One entry per fix
+        self.type_codes = array('H')
+        self.status_codes = array('b')  # Position in STATUSES
+        # One entry per occurrence, in the order they were added
+        self.occurrence_starts = array('q')
+        self.occurrence_ends = array('q')
+        self.occurrence_fixes = array('l')  # Fix number
+        self.occurrence_numbers = array('l')  # Occurrence number within its fix
+        self._text_order: Optional[List[int]] = None  # Occurrences sorted by start
+        self._by_status: Dict[str, List[int]] = {status: [] for status in STATUSES}
+        self.occurrence_count = 0
+        self.override_count = 0
+
+    def __len__(self) -> int:
+        return len(self._fixes)
+
+    def __getitem__(self, index: int) -> SuggestedFix:
+        return self._fixes[index]
+
+    def __iter__(self) -> Iterator[SuggestedFix]:
+        return iter(self._fixes)
+
+    def _add_occurrences(self, index: int, occurrences: Sequence[Occurrence], first_number: int):
+        for number, occurrence in enumerate(occurrences, start=first_number):
+            self.occurrence_starts.append(occurrence.start)
+            self.occurrence_ends.append(occurrence.end)
+            self.occurrence_fixes.append(index)
+            self.occurrence_numbers.append(number)
+        self.occurrence_count += len(occurrences)
+        self._text_order = None
+
+    def add(self, fix: SuggestedFix) -> bool:
+        """Add a fix, or add its occurrences to the fix already there for the
+        same issue. Returns whether it was added as a new fix."""
+        key = fix.group_key()
+        existing = self._groups.get(key)
+        if existing is not None:
+            known = self._fixes[existing]
+            self._add_occurrences(existing, fix.occurrences, len(known.occurrences))
+            known.add_occurrences(fix)
+            return False
+        
+        index = len(self._fixes)
+        code = self._type_codes.get(fix.issue_type)
+        if code is None:
+            code = self._type_codes[fix.issue_type] = len(self.types)
+            self.types.append(fix.issue_type)
+        status = fix.status
+        self._groups[key] = index
+        self._fixes.append(fix)
+        self.type_codes.append(code)
+        self.status_codes.append(STATUSES.index(status))
+        self._by_status[status].append(index)
+        self._add_occurrences(index, fix.occurrences, 0)
+        self.override_count += len(fix.overrides)
+        return True
+
+    def status(self, index: int) -> str:
+        return STATUSES[self.status_codes[index]]
+
+    def set_status(self, index: int, status: str):
+        """Decide a fix as a whole"""
+        old = self.status(index)
+        if old != status:
+            indexes = self._by_status[old]
+            del indexes[bisect_left(indexes, index)]
+            insort(self._by_status[status], index)
+            self.status_codes[index] = STATUSES.index(status)
+            self._fixes[index]._status = status
+
+    def occurrence_status(self, index: int, number: int) -> str:
+        """Decision for one occurrence: its override, or the fix's own"""
+        return self._fixes[index].overrides.get(number) or self.status(index)
+
+    def located(self) -> Iterator[tuple]:
+        """(start, end, fix number, occurrence number) for every occurrence,
+        in text order"""
+        if self._text_order is None:
+            starts, fixes, numbers = self.occurrence_starts, self.occurrence_fixes, self.occurrence_numbers
+            self._text_order = sorted(range(len(starts)), key=lambda i: (starts[i], fixes[i], numbers[i]))
+        for i in self._text_order:
+            yield (self.occurrence_starts[i], self.occurrence_ends[i],
+                   self.occurrence_fixes[i], self.occurrence_numbers[i])
+
+    def decisions(self) -> Dict[tuple, tuple]:
+        """Every review choice made so far, by issue (the group key the fix
+        was added under), for `restore_decisions` after a re-scan"""
+        saved = {}
+        for key, index in self._groups.items():
+            fix = self._fixes[index]
+            status = self.status(index)
+            if status != PENDING or fix.overrides or fix._selected_replacement:
+                saved[key] = (status, dict(fix.overrides), list(fix.occurrences),
+                              fix._selected_replacement, fix.capitalize)
+        return saved
+
+    def restore_decisions(self, saved: Dict[tuple, tuple]) -> int:
+        """Reapply `decisions()` from an earlier scan to the same issues found
+        again. Occurrence overrides only carry over if the issue was found in
+        exactly the same places. Returns how many fixes got a decision back."""
+        restored = 0
+        for key, index in self._groups.items():
+            if key not in saved:
+                continue
+            status, overrides, occurrences, replacement, capitalize = saved[key]
+            fix = self._fixes[index]
+            if replacement:
+                fix._selected_replacement = replacement  # Already capitalized
+            fix.capitalize = capitalize
+            self.set_status(index, status)
+            if occurrences == fix.occurrences:
+                for number, override in overrides.items():
+                    self.set_override(index, number, override)
+            restored += status != PENDING or bool(overrides)
+        return restored
+
+    def set_override(self, index: int, number: int, status: Optional[str]):
+        """Decide one occurrence of a fix (None to follow the fix again)"""
+        overrides = self._fixes[index].overrides
+        self.override_count -= number in overrides
+        if status is None:
+            overrides.pop(number, None)
+        else:
+            overrides[number] = status
+            self.override_count += 1
+
+    def clear_overrides(self):
+        for fix in self._fixes:
+            fix.overrides.clear()
+        self.override_count = 0
+
+    def count(self, status: str) -> int:
+        return len(self._by_status[status])
+
+    def indexes(self, status: Optional[str] = None, types: Sequence[str] = ()) -> List[int]:
+        """Numbers of the fixes with a decision (any if None) and one of the
+        issue types (any if empty), in order"""
+        candidates = self._by_status[status] if status else range(len(self._fixes))
+        if not types:
+            return list(candidates)
+        codes = {self._type_codes[t] for t in types if t in self._type_codes}
+        type_codes = self.type_codes
+        return [i for i in candidates if type_codes[i] in codes]
+
+    def with_status(self, status: str) -> List[SuggestedFix]:
+        return [self._fixes[i] for i in self._by_status[status]]
+
+class ReviewInterface:
+    def __init__(self, linked_fragments: Sequence[str] = ()):
+        # Keys of app fragments that also show decisions (e.g. the document
+        # versions) and need to rerun when one is made
+        self.linked_fragments = tuple(linked_fragments)
         if 'fixes' not in st.session_state:
-            st.session_state.fixes = []
+            st.session_state.fixes = FixStore()
         if 'decisions' not in st.session_state:
             st.session_state.decisions = {'accepted': [], 'rejected': []}
         if 'changes_to_apply' not in st.session_state:
@@ -124,26 +394,35 @@ class ReviewInterface:
             st.session_state.batch_decisions = {}
     
     def add_fix(self, fix: SuggestedFix):
-        """Add a new fix to the list"""
+        """Add a new fix to the list, or add its occurrences to the fix
+        already there for the same issue"""
         # Check if the original text is capitalized
         if fix.original_text[0].isupper() or fix.original_text.isupper():
             fix.capitalize = True
-        st.session_state.fixes.append(fix)
+        st.session_state.fixes.add(fix)
     
     def clear_fixes(self):
         """Clear all fixes and reset state"""
-        st.session_state.fixes = []
+        # Fix widgets are keyed by position, so the next document's fixes
+        # would otherwise pick up this one's choices
+        fix_keys = tuple(prefix + "fix_" for prefix in FIX_WIDGET_PREFIXES)
+        for key in list(st.session_state):
+            if isinstance(key, str) and key.startswith(fix_keys):
+                del st.session_state[key]
+        st.session_state.fixes = FixStore()
         st.session_state.decisions = {'accepted': [], 'rejected': []}
         st.session_state.changes_to_apply = False
         st.session_state.batch_decisions = {}
+        st.session_state.pop('marked_document', None)
+        st.session_state.pop('review_page', None)
     
     def get_accepted_fixes(self) -> List[SuggestedFix]:
         """Get all accepted fixes"""
-        return [fix for fix in st.session_state.fixes if fix.accepted]
+        return st.session_state.fixes.with_status(ACCEPTED)
     
     def get_rejected_fixes(self) -> List[SuggestedFix]:
         """Get all rejected fixes"""
-        return [fix for fix in st.session_state.fixes if fix.rejected]
+        return st.session_state.fixes.with_status(REJECTED)
     
     def render_diff(self, original: str, suggested: str) -> str:
         """Create a HTML diff view of the changes"""
@@ -160,31 +439,58 @@ class ReviewInterface:
 
     def reset_all_fixes(self):
         """Reset all fixes to their initial state"""
-        for fix in st.session_state.fixes:
-            fix.accepted = False
-            fix.rejected = False
+        store = st.session_state.fixes
+        for index in store.indexes(ACCEPTED) + store.indexes(REJECTED):
+            store.set_status(index, PENDING)
+        store.clear_overrides()
+
+    def render_fix(self, fix: SuggestedFix, index: int = 0, issue_key: str = None, fragment: str = None):
+        """Render a single fix with its context and actions.
+
+        `fragment` is the key of the fragment the fix is rendered in, which
+        is rerun (with the counters and summary) when a decision is made.
+        """
+        # Create a unique key for this fix using the issue_key if provided
+        unique_key = f"{issue_key}" if issue_key else f"{fix.issue_type}_{index}_{fix.start}"
 
-    def render_fix(self, fix: SuggestedFix, index: int = 0, issue_key: str = None):
-        """Render a single fix with its context and actions"""
         if fix.accepted or fix.rejected:
+            # Decided fixes only show their outcome, with a way to undo it
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                if fix.accepted:
+                    st.markdown(f"✅ **{fix.issue_type}:** '{fix.original_text}' → '{fix.selected_replacement}'")
+                else:
+                    st.markdown(f"❌ **{fix.issue_type}:** kept '{fix.original_text}'")
+            with col2:
+                st.button(
+                    label=f"↩️ Undo {index+1}",
+                    key=f"undo_{unique_key}",
+                    help="Return this issue to pending",
+                    on_click=self.decide,
+                    args=(index, PENDING, fragment),
+                    use_container_width=True
+                )
+            self.render_occurrences(fix, index, unique_key, fragment)
+            st.markdown("---")
             return
 
-        # Create a unique key for this fix using the issue_key if provided
-        unique_key = f"{issue_key}" if issue_key else f"{fix.issue_type}_{index}_{hash(fix.context)}"
+        st.markdown(f"**{fix.issue_type}**")
 
+        context = fix.get_context(st.session_state.get('original_text', ""))
         col1, col2 = st.columns([3, 1])
         with col1:
-            st.markdown(f"**Context:**")
-            st.markdown(fix.context.replace(fix.original_text, f"**{fix.original_text}**"))
+            st.markdown(f"**Context (page {fix.page}):**" if fix.page else f"**Context:**")
+            st.markdown(context.replace(fix.original_text, f"**{fix.original_text}**"))
             
             # Show replacement options if they exist
-            if fix.suggested_text:
+            suggested_text = fix.get_suggested_text()
+            if suggested_text:
                 # Handle em dash replacements
                 if fix.issue_type == "Em Dash Usage":
-                    replacement_options = [opt.strip() + " " for opt in fix.suggested_text.split('|')]  # Add space after each option
+                    replacement_options = [opt.strip() + " " for opt in suggested_text.split('|')]  # Add space after each option
                 # Handle normal comma-separated replacements
                 else:
-                    replacement_options = [opt.strip() for opt in fix.suggested_text.split(',')]
+                    replacement_options = [opt.strip() for opt in suggested_text.split(',')]
                 
                 # Add custom input option
                 use_custom = st.checkbox(
@@ -237,7 +543,7 @@ class ReviewInterface:
                 
                 # Show preview
                 st.markdown("**Preview:**")
-                preview = fix.context.replace(
+                preview = context.replace(
                     fix.original_text,
                     f"<span style='background-color: #90EE90'>{fix.selected_replacement}</span>"
                 )
@@ -251,7 +557,8 @@ class ReviewInterface:
                     label=f"✅ Accept {index+1}",
                     key=f"accept_{unique_key}",
                     help=f"Accept the change from '{fix.original_text}' to '{fix.selected_replacement}'",
-                    on_click=lambda fix=fix: setattr(fix, 'accepted', True),
+                    on_click=self.decide,
+                    args=(index, ACCEPTED, fragment),
                     use_container_width=True
                 )
             
@@ -260,12 +567,118 @@ class ReviewInterface:
                     label=f"❌ Reject {index+1}",
                     key=f"reject_{unique_key}",
                     help=f"Reject the change and keep '{fix.original_text}'",
-                    on_click=lambda fix=fix: setattr(fix, 'rejected', True),
+                    on_click=self.decide,
+                    args=(index, REJECTED, fragment),
                     use_container_width=True
                 )
         
+        self.render_occurrences(fix, index, unique_key, fragment)
         st.markdown("---")
 
+    def render_occurrences(self, fix: SuggestedFix, index: int, unique_key: str, fragment: str = None):
+        """For issues found more than once: the occurrence count, and on
+        request each occurrence with its own decision"""
+        count = len(fix.occurrences)
+        if count < 2:
+            return
+        pages = f" on pages {', '.join(map(str, fix.pages))}" if fix.pages else ""
+        overridden = f", {len(fix.overrides)} decided separately" if fix.overrides else ""
+        show = st.checkbox(
+            label=f"Review all {count} occurrences individually{pages}{overridden}",
+            value=False,
+            key=f"occurrences_{unique_key}",
+            help="The decision above applies to every occurrence unless you override it here"
+        )
+        if not show:
+            return
+        
+        text = st.session_state.get('original_text', "")
+        choices = list(OCCURRENCE_CHOICES)
+        for number, occurrence in enumerate(fix.occurrences):
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                before = text[max(0, occurrence.start - 50):occurrence.start]
+                after = text[occurrence.end:occurrence.end + 50]
+                location = f"(page {occurrence.page}) " if occurrence.page else ""
+                st.markdown(f"{location}...{before}**{text[occurrence.start:occurrence.end]}**{after}...")
+            with col2:
+                override = fix.overrides.get(number)
+                key = f"occurrence_{unique_key}_{number}"
+                # Show the store's override, which Reset All and new scans
+                # change without going through this widget
+                st.session_state[key] = choices[[OCCURRENCE_CHOICES[c] for c in choices].index(override)]
+                st.selectbox(
+                    label=f"Occurrence {number + 1}",
+                    options=choices,
+                    key=key,
+                    on_change=self.decide_occurrence,
+                    args=(index, number, key, fragment),
+                    label_visibility="collapsed"
+                )
+
+    @st.fragment(key="review_list")
+    def render_review_page(self):
+        """Render one page of fixes, filtered by issue type and status"""
+        fixes = st.session_state.fixes
+        issue_types = fixes.types
+        # Drop filters left over from a previous document
+        if 'review_types' in st.session_state:
+            st.session_state.review_types = [t for t in st.session_state.review_types if t in issue_types]
+        
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            selected_types = st.multiselect(
+                "Issue type",
+                issue_types,
+                key="review_types",
+                placeholder="All issue types",
+                help="Only show these types of issue",
+                on_change=_first_page
+            )
+        with col2:
+            status = st.selectbox(
+                "Status",
+                list(REVIEW_STATUSES),
+                key="review_status",
+                help="Only show issues with this decision",
+                on_change=_first_page
+            )
+        with col3:
+            page_size = st.selectbox(
+                "Issues per page",
+                PAGE_SIZES,
+                index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE) if DEFAULT_PAGE_SIZE in PAGE_SIZES else 0,
+                key="review_page_size",
+                on_change=_first_page
+            )
+        
+        visible = fixes.indexes(REVIEW_STATUSES[status], selected_types)
+        if not visible:
+            st.info("No issues match these filters.")
+            return
+        
+        page_count = -(-len(visible) // page_size)
+        if st.session_state.get('review_page', 1) > page_count:
+            st.session_state.review_page = page_count
+        page = st.number_input("Page", min_value=1, max_value=page_count, step=1, key="review_page")
+        first = (page - 1) * page_size
+        window = visible[first:first + page_size]
+        st.caption(f"Showing issues {first + 1}–{first + len(window)} of {len(visible)} (page {page} of {page_count})")
+        
+        for i in window:
+            self.render_card(i)
+
+    def render_card(self, index: int):
+        """Render one fix as its own fragment, so working on it only reruns
+        this card"""
+        fragment = f"card_{index}"
+        
+        @st.fragment(key=fragment)
+        def card():
+            self.render_fix(st.session_state.fixes[index], index, issue_key=f"fix_{index}", fragment=fragment)
+        
+        card()
+
     def render_interface(self):
         """Render the review interface with all suggested fixes"""
         # Load and inject CSS
@@ -293,7 +706,52 @@ class ReviewInterface:
         
         st.markdown("## Review Suggested Fixes")
         
-        # Add batch action buttons at the top
+        # Each part below is a fragment: a decision reruns its own card plus
+        # the counters and summary, not the whole app
+        self.render_batch_actions()
+        
+        st.markdown("---")
+        
+        # Only the current page of fixes gets widgets
+        self.render_review_page()
+        
+        self.render_counters()
+        
+        self.render_summary()
+    
+    def refresh(self, *fragments: str):
+        """From a widget callback: rerun the given fragments plus everything
+        that shows the decisions, instead of the whole app"""
+        st.rerun(list(fragments) + list(DECISION_FRAGMENTS) + list(self.linked_fragments))
+
+    def decide(self, index: int, status: str, fragment: Optional[str] = None):
+        """Record a decision on one fix (widget callback)"""
+        st.session_state.fixes.set_status(index, status)
+        if fragment:
+            self.refresh(fragment)
+
+    def decide_occurrence(self, index: int, number: int, key: str, fragment: Optional[str] = None):
+        """Override the decision for one occurrence (widget callback reading
+        the choice from widget `key`)"""
+        st.session_state.fixes.set_override(index, number, OCCURRENCE_CHOICES[st.session_state[key]])
+        if fragment:
+            self.refresh(fragment)
+
+    def decide_all(self, action: str):
+        """Apply a batch action to every fix (widget callback)"""
+        store = st.session_state.fixes
+        if action in ("accept", "reject"):
+            # Only pending fixes; decided ones keep their decision
+            status = ACCEPTED if action == "accept" else REJECTED
+            for index in store.indexes(PENDING):
+                store.set_status(index, status)
+        else:
+            self.reset_all_fixes()
+        self.refresh("review_list")
+
+    @st.fragment(key="review_batch")
+    def render_batch_actions(self):
+        """Accept, reject or reset every fix at once"""
         col1, col2, col3 = st.columns(3)
         with col1:
             st.button(
@@ -301,7 +759,8 @@ class ReviewInterface:
                 type="primary",
                 key="accept_all_btn",
                 help="Accept all pending changes",
-                on_click=lambda: [setattr(fix, 'accepted', True) for fix in st.session_state.fixes if not fix.rejected],
+                on_click=self.decide_all,
+                args=("accept",),
                 use_container_width=True
             )
         with col2:
@@ -310,7 +769,8 @@ class ReviewInterface:
                 type="secondary",
                 key="reject_all_btn",
                 help="Reject all pending changes",
-                on_click=lambda: [setattr(fix, 'rejected', True) for fix in st.session_state.fixes if not fix.accepted],
+                on_click=self.decide_all,
+                args=("reject",),
                 use_container_width=True
             )
         with col3:
@@ -318,220 +778,328 @@ class ReviewInterface:
                 label="🔄 Reset All Changes",
                 key="reset_all_btn",
                 help="Reset all decisions",
-                on_click=self.reset_all_fixes,
+                on_click=self.decide_all,
+                args=("reset",),
                 use_container_width=True
             )
-        
-        st.markdown("---")
-        
-        # Group fixes by type for better organization
-        fixes_by_type = {}
-        for fix in st.session_state.fixes:
-            if fix.issue_type not in fixes_by_type:
-                fixes_by_type[fix.issue_type] = []
-            fixes_by_type[fix.issue_type].append(fix)
-        
-        # Show fixes grouped by type
-        for issue_type, fixes in fixes_by_type.items():
-            with st.expander(f"{issue_type} ({len(fixes)} issues)", expanded=False):
-                for i, fix in enumerate(fixes):
-                    self.render_fix(fix, i)
+
+    @st.fragment(key="review_counters")
+    def render_counters(self):
+        """Decision counts and whether anything is left to review"""
+        fixes = st.session_state.fixes
+        accepted = fixes.count(ACCEPTED)
+        rejected = fixes.count(REJECTED)
+        pending = fixes.count(PENDING)
+        occurrences = fixes.occurrence_count
+        overridden = fixes.override_count
+        caption = f"✅ {accepted} accepted · ❌ {rejected} rejected · ⏳ {pending} pending"
+        if occurrences > len(fixes):
+            caption += f" · {occurrences} occurrences in total"
+        if overridden:
+            caption += f", {overridden} decided separately"
+        st.caption(caption)
         
         # Show apply changes button if there are decisions to apply
-        if any(not (fix.accepted or fix.rejected) for fix in st.session_state.fixes):
+        if pending:
             st.warning("⚠️ Some changes are still pending review")
         else:
             st.success("✅ All changes have been reviewed!")
-        
-        # Show summary of decisions
-        if any(fix.accepted or fix.rejected for fix in st.session_state.fixes) or any(not (fix.accepted or fix.rejected) for fix in st.session_state.fixes):
-            with st.expander("📊 Summary Report", expanded=False):
-                st.markdown(f"**Total Issues Found:** {len(st.session_state.fixes)}")
-                
-                accepted = [fix for fix in st.session_state.fixes if fix.accepted]
-                rejected = [fix for fix in st.session_state.fixes if fix.rejected]
-                pending = [fix for fix in st.session_state.fixes if not (fix.accepted or fix.rejected)]
-                
-                if accepted:
-                    st.markdown("### ✅ Accepted Changes")
-                    for fix in accepted:
-                        st.markdown(f"- {fix.issue_type}: '{fix.original_text}' → '{fix.get_selected_replacement()}'")
-                
-                if rejected:
-                    st.markdown("### ❌ Rejected Changes")
-                    for fix in rejected:
-                        st.markdown(f"- {fix.issue_type}: Kept '{fix.original_text}'")
-                
-                if pending:
-                    st.markdown("### ⏳ Pending Reviews")
-                    for fix in pending:
-                        st.markdown(f"- {fix.issue_type}: '{fix.original_text}'")
-    
+
+    @st.fragment(key="review_summary")
+    def render_summary(self):
+        """Show summary of decisions"""
+        with st.expander("📊 Summary Report", expanded=False):
+            st.markdown(f"**Total Issues Found:** {len(st.session_state.fixes)}")
+
+            accepted = st.session_state.fixes.with_status(ACCEPTED)
+            rejected = st.session_state.fixes.with_status(REJECTED)
+            pending = st.session_state.fixes.with_status(PENDING)
+
+            def times(fix: SuggestedFix) -> str:
+                """Occurrence count and separately decided ones, if any"""
+                count = len(fix.occurrences)
+                note = f" (×{count})" if count > 1 else ""
+                if fix.overrides:
+                    note += f" ({len(fix.overrides)} decided separately)"
+                return note
+
+            # One element per section, however many fixes there are
+            if accepted:
+                st.markdown("### ✅ Accepted Changes")
+                st.markdown("\n".join(
+                    f"- {fix.issue_type}: '{fix.original_text}' → '{fix.get_selected_replacement()}'{times(fix)}"
+                    for fix in accepted
+                ))
+
+            if rejected:
+                st.markdown("### ❌ Rejected Changes")
+                st.markdown("\n".join(
+                    f"- {fix.issue_type}: Kept '{fix.original_text}'{times(fix)}" for fix in rejected
+                ))
+
+            if pending:
+                st.markdown("### ⏳ Pending Reviews")
+                st.markdown("\n".join(f"- {fix.issue_type}: '{fix.original_text}'{times(fix)}" for fix in pending))
+
+    def decision_state(self) -> int:
+        """Hash of every fix's review state (decision and chosen replacement).
+        It only changes when a decision actually does, so it can key caches
+        of anything rendered from the decisions."""
+        return hash(tuple(
+            (fix.start, len(fix.occurrences), fix.accepted, fix.rejected,
+             tuple(sorted(fix.overrides.items())),
+             fix.selected_replacement if fix.accepted or ACCEPTED in fix.overrides.values() else None)
+            for fix in st.session_state.fixes
+        ))
+
+    def located_occurrences(self):
+        """(occurrence, fix, decision) for every occurrence, in text order,
+        read from the store's occurrence columns"""
+        store = st.session_state.fixes
+        return [
+            (Occurrence(start, end), store[index], store.occurrence_status(index, number))
+            for start, end, index, number in store.located()
+        ]
+
     def generate_marked_document(self, text: str) -> str:
-        """Generate a marked-up version of the document with issues highlighted"""
-        marked_text = text
-        for fix in st.session_state.fixes:
-            if fix.accepted:
+        """Generate a marked-up version of the document with issues highlighted.
+
+        Built in one left-to-right pass over the fixes' offsets, with the
+        document text HTML-escaped. The result is reused until a decision
+        changes.
+        """
+        key = (hash(text), len(text), self.decision_state())
+        cached = st.session_state.get('marked_document')
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        # Only fixes with offsets can be placed in the text
+        pieces = ['<div class="marked-document">']
+        position = 0
+        for occurrence, fix, status in self.located_occurrences():
+            if occurrence.start < position:
+                continue  # Overlaps a fix that has already been marked
+            if status == ACCEPTED:
                 color = "#90EE90"  # Light green for accepted
                 replacement = fix.selected_replacement
-            elif fix.rejected:
+            elif status == REJECTED:
                 color = "#FFB6C1"  # Light red for rejected
-                replacement = fix.original_text
+                replacement = text[occurrence.start:occurrence.end]
             else:
                 color = "#FFE4B5"  # Light orange for pending
-                replacement = fix.original_text
-            
-            marked_text = marked_text.replace(
-                fix.original_text,
-                f'<span style="background-color: {color}">{replacement}</span>'
-            )
+                replacement = text[occurrence.start:occurrence.end]
+            pieces.append(_escape_text(text[position:occurrence.start]))
+            pieces.append(f'<span style="background-color: {color}">{_escape_text(replacement)}</span>')
+            position = occurrence.end
+        pieces.append(_escape_text(text[position:]))
+        pieces.append('</div>')
+        
+        marked_text = "".join(pieces)
+        st.session_state.marked_document = (key, marked_text)
         return marked_text
     
     def generate_clean_document(self, text: str) -> str:
-        """Generate a clean version with all accepted changes applied"""
-        clean_text = text
+        """Generate a clean version with all accepted changes applied.
+
+        Each accepted fix replaces only its own occurrence: the text is copied
+        once, left to right, with replacements written in at their offsets.
+        """
+        pieces = []
+        position = 0
+        for occurrence, fix, status in self.located_occurrences():
+            if status != ACCEPTED or occurrence.start < position:
+                continue  # Not accepted, or overlaps a fix already applied
+            pieces.append(text[position:occurrence.start])
+            pieces.append(fix.selected_replacement)
+            position = occurrence.end
+        pieces.append(text[position:])
+        clean_text = "".join(pieces)
+        
+        # Fixes created without offsets fall back to replacing every occurrence
         for fix in self.get_accepted_fixes():
-            clean_text = clean_text.replace(fix.original_text, fix.selected_replacement)
+            if not fix.occurrences:
+                clean_text = clean_text.replace(fix.original_text, fix.selected_replacement)
         return clean_text
     
     def generate_report(self) -> Dict:
         """Generate a summary report of all changes"""
         return {
             'total_issues': len(st.session_state.fixes),
-            'accepted': [(fix.issue_type, fix.original_text, fix.suggested_text) 
+            'accepted': [(fix.issue_type, fix.original_text, fix.get_suggested_text()) 
                         for fix in self.get_accepted_fixes()],
             'rejected': [(fix.issue_type, fix.original_text) 
                         for fix in self.get_rejected_fixes()],
             'pending': [(fix.issue_type, fix.original_text) 
-                       for fix in st.session_state.fixes 
-                       if not (fix.accepted or fix.rejected)]
+                       for fix in st.session_state.fixes.with_status(PENDING)]
         }
 
     def create_downloadable_report(self, text: str) -> bytes:
         """Create a PDF report of all changes"""
-        def sanitize_text(text: str) -> str:
-            """Replace Unicode characters with ASCII equivalents"""
-            replacements = {
-                '\u2014': '--',  # em dash
-                '\u2013': '-',   # en dash
-                '\u2018': "'",   # left single quote
-                '\u2019': "'",   # right single quote
-                '\u201C': '"',   # left double quote
-                '\u201D': '"',   # right double quote
-                '\u2026': '...', # ellipsis
-                '\u2022': '*',   # bullet
-                '\u2012': '-',   # figure dash
-                '\u2015': '--',  # horizontal bar
-                '\u00A0': ' ',   # non-breaking space
-            }
-            for unicode_char, ascii_char in replacements.items():
-                text = text.replace(unicode_char, ascii_char)
-            return text
-
-        pdf = PDF()
-        
-        # Title Page
-        pdf.add_page()
-        pdf.set_font('Helvetica', 'B', 24)
-        pdf.cell(0, 20, "Copy Check Report", ln=True, align='C')
-        pdf.set_font('Helvetica', '', 12)
-        pdf.cell(0, 10, f"Generated on {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align='C')
-        
-        # Summary statistics
-        pdf.add_page()
-        pdf.chapter_title("Summary Statistics")
-        total_issues = len(st.session_state.fixes)
-        accepted_count = len([fix for fix in st.session_state.fixes if fix.accepted])
-        rejected_count = len([fix for fix in st.session_state.fixes if fix.rejected])
-        pending_count = total_issues - accepted_count - rejected_count
-        
-        pdf.cell(0, 10, f"Total Issues Found: {total_issues}", ln=True)
-        pdf.accepted_text(f"Accepted Changes: {accepted_count}")
-        pdf.rejected_text(f"Rejected Changes: {rejected_count}")
-        if pending_count > 0:
-            pdf.cell(0, 10, f"Pending Decisions: {pending_count}", ln=True)
+        return build_report_pdf(list(st.session_state.fixes), st.session_state.get('tone_metrics'), text)
+
+
+def build_report_pdf(fixes: List[SuggestedFix], tone_metrics: Optional[Dict] = None, text: str = "") -> bytes:
+    """Create a PDF report of the given fixes and tone metrics. `text` is
+    the original document, which the fixes' context is taken from.
+
+    Doesn't touch Streamlit state, so it can run on a worker thread; pass
+    copies of the fixes if they may change meanwhile.
+    """
+    def sanitize_text(text: str) -> str:
+        """Replace Unicode characters with ASCII equivalents"""
+        replacements = {
+            '\u2014': '--',  # em dash
+            '\u2013': '-',   # en dash
+            '\u2018': "'",   # left single quote
+            '\u2019': "'",   # right single quote
+            '\u201C': '"',   # left double quote
+            '\u201D': '"',   # right double quote
+            '\u2026': '...', # ellipsis
+            '\u2022': '*',   # bullet
+            '\u2012': '-',   # figure dash
+            '\u2015': '--',  # horizontal bar
+            '\u00A0': ' ',   # non-breaking space
+        }
+        for unicode_char, ascii_char in replacements.items():
+            text = text.replace(unicode_char, ascii_char)
+        return text
+
+    pdf = PDF()
+
+    # Title Page
+    pdf.add_page()
+    pdf.set_font('Helvetica', 'B', 24)
+    pdf.cell(0, 20, "Copy Check Report", ln=True, align='C')
+    pdf.set_font('Helvetica', '', 12)
+    pdf.cell(0, 10, f"Generated on {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align='C')
+
+    # Summary statistics
+    pdf.add_page()
+    pdf.chapter_title("Summary Statistics")
+    total_issues = len(fixes)
+    accepted_count = len([fix for fix in fixes if fix.accepted])
+    rejected_count = len([fix for fix in fixes if fix.rejected])
+    pending_count = total_issues - accepted_count - rejected_count
+
+    pdf.cell(0, 10, f"Total Issues Found: {total_issues}", ln=True)
+    pdf.accepted_text(f"Accepted Changes: {accepted_count}")
+    pdf.rejected_text(f"Rejected Changes: {rejected_count}")
+    if pending_count > 0:
+        pdf.cell(0, 10, f"Pending Decisions: {pending_count}", ln=True)
+    pdf.ln(10)
+
+    # Group fixes by type
+    fixes_by_type = {}
+    for fix in fixes:
+        if fix.issue_type not in fixes_by_type:
+            fixes_by_type[fix.issue_type] = []
+        fixes_by_type[fix.issue_type].append(fix)
+
+    # Issues by Type
+    pdf.add_page()
+    pdf.chapter_title("Issues by Type")
+
+    for issue_type, type_fixes in fixes_by_type.items():
+        pdf.issue_header(sanitize_text(f"{issue_type} ({len(type_fixes)} issues)"))
+
+        for fix in type_fixes:
+            # Original text and context
+            if len(fix.occurrences) > 1:
+                pages = f" on pages {', '.join(map(str, fix.pages))}" if fix.pages else ""
+                location = f" ({len(fix.occurrences)} occurrences{pages})"
+            else:
+                location = f" (page {fix.page})" if fix.page else ""
+            pdf.cell(0, 10, sanitize_text(f"Original: '{fix.original_text}'{location}"), ln=True)
+            pdf.cell(0, 10, sanitize_text(f"Context: {fix.get_context(text)}"), ln=True)
+
+            # Show decision and replacement
+            if fix.accepted:
+                pdf.accepted_text(sanitize_text(f"ACCEPTED - Changed to: '{fix.get_selected_replacement()}'"))
+            elif fix.rejected:
+                pdf.rejected_text(sanitize_text(f"REJECTED - Kept original: '{fix.original_text}'"))
+            else:
+                pdf.cell(0, 10, "PENDING DECISION", ln=True)
+            if fix.overrides:
+                decided = ", ".join(
+                    f"#{number + 1} {status}" for number, status in sorted(fix.overrides.items())
+                )
+                pdf.cell(0, 10, sanitize_text(f"Decided separately: {decided}"), ln=True)
+
+            # If there were multiple suggestions, show them
+            suggested_text = fix.get_suggested_text()
+            if fix.issue_type == "AI Pattern: Em Dash Usage":
+                suggestions = [s.strip() for s in suggested_text.split('|')]
+                if len(suggestions) > 1:
+                    pdf.cell(0, 10, "Available replacements:", ln=True)
+                    for i, suggestion in enumerate(suggestions, 1):
+                        pdf.cell(0, 10, sanitize_text(f"  {i}. {suggestion}"), ln=True)
+            elif suggested_text and ',' in suggested_text:
+                suggestions = [s.strip() for s in suggested_text.split(',')]
+                if len(suggestions) > 1:
+                    pdf.cell(0, 10, "Available replacements:", ln=True)
+                    for i, suggestion in enumerate(suggestions, 1):
+                        pdf.cell(0, 10, sanitize_text(f"  {i}. {suggestion}"), ln=True)
+
+            pdf.ln(5)
         pdf.ln(10)
-        
-        # Group fixes by type
-        fixes_by_type = {}
-        for fix in st.session_state.fixes:
-            if fix.issue_type not in fixes_by_type:
-                fixes_by_type[fix.issue_type] = []
-            fixes_by_type[fix.issue_type].append(fix)
-        
-        # Issues by Type
+
+    # Add Tone Analysis section if available
+    if tone_metrics:
+        metrics = tone_metrics
         pdf.add_page()
-        pdf.chapter_title("Issues by Type")
-        
-        for issue_type, fixes in fixes_by_type.items():
-            pdf.issue_header(sanitize_text(f"{issue_type} ({len(fixes)} issues)"))
-            
-            for fix in fixes:
-                # Original text and context
-                pdf.cell(0, 10, sanitize_text(f"Original: '{fix.original_text}'"), ln=True)
-                pdf.cell(0, 10, sanitize_text(f"Context: {fix.context}"), ln=True)
-                
-                # Show decision and replacement
-                if fix.accepted:
-                    pdf.accepted_text(sanitize_text(f"ACCEPTED - Changed to: '{fix.get_selected_replacement()}'"))
-                elif fix.rejected:
-                    pdf.rejected_text(sanitize_text(f"REJECTED - Kept original: '{fix.original_text}'"))
-                else:
-                    pdf.cell(0, 10, "PENDING DECISION", ln=True)
-                
-                # If there were multiple suggestions, show them
-                if fix.issue_type == "AI Pattern: Em Dash Usage":
-                    suggestions = [s.strip() for s in fix.suggested_text.split('|')]
-                    if len(suggestions) > 1:
-                        pdf.cell(0, 10, "Available replacements:", ln=True)
-                        for i, suggestion in enumerate(suggestions, 1):
-                            pdf.cell(0, 10, sanitize_text(f"  {i}. {suggestion}"), ln=True)
-                elif fix.suggested_text and ',' in fix.suggested_text:
-                    suggestions = [s.strip() for s in fix.suggested_text.split(',')]
-                    if len(suggestions) > 1:
-                        pdf.cell(0, 10, "Available replacements:", ln=True)
-                        for i, suggestion in enumerate(suggestions, 1):
-                            pdf.cell(0, 10, sanitize_text(f"  {i}. {suggestion}"), ln=True)
-                
-                pdf.ln(5)
-            pdf.ln(10)
-        
-        # Add Tone Analysis section if available
-        if 'tone_metrics' in st.session_state:
-            metrics = st.session_state.tone_metrics
-            pdf.add_page()
-            pdf.chapter_title("Tone Analysis")
-            
-            # Main metrics
-            metrics_text = (
-                f"Formality Score: {metrics['formality']:.1f}%\n"
-                f"Descriptiveness Score: {metrics['descriptiveness']:.1f}%\n"
-                f"Sentiment Score: {metrics['sentiment']:.1f}%\n\n"
-                f"Average Sentence Length: {metrics['avg_sentence_length']:.1f} words\n"
-                f"Vocabulary Richness: {metrics['vocabulary_richness']:.1f}%\n"
-                f"Word Count: {metrics['word_count']}\n"
-                f"Sentence Count: {metrics['sentence_count']}"
-            )
-            pdf.multi_cell(0, 10, metrics_text)
+        pdf.chapter_title("Tone Analysis")
+
+        # Main metrics
+        metrics_text = (
+            f"Formality Score: {metrics['formality']:.1f}%\n"
+            f"Descriptiveness Score: {metrics['descriptiveness']:.1f}%\n"
+            f"Sentiment Score: {metrics['sentiment']:.1f}%\n\n"
+            f"Average Sentence Length: {metrics['avg_sentence_length']:.1f} words\n"
+            f"Vocabulary Richness: {metrics['vocabulary_richness']:.1f}%\n"
+            f"Word Count: {metrics['word_count']}\n"
+            f"Sentence Count: {metrics['sentence_count']}"
+        )
+        pdf.multi_cell(0, 10, metrics_text)
+        pdf.ln(10)
+
+        # Interpretation
+        formality = "very formal" if metrics['formality'] > 75 else "formal" if metrics['formality'] > 60 else "neutral" if metrics['formality'] > 40 else "informal" if metrics['formality'] > 25 else "very informal"
+        descriptiveness = "highly descriptive" if metrics['descriptiveness'] > 75 else "moderately descriptive" if metrics['descriptiveness'] > 50 else "somewhat descriptive" if metrics['descriptiveness'] > 25 else "minimally descriptive"
+        sentiment = "very positive" if metrics['sentiment'] > 75 else "positive" if metrics['sentiment'] > 60 else "neutral" if metrics['sentiment'] > 40 else "negative" if metrics['sentiment'] > 25 else "very negative"
+
+        interpretation_text = (
+            f"The text appears to be {formality} in tone, {descriptiveness} in detail, "
+            f"and {sentiment} in emotional tone.\n\n"
+            f"The vocabulary richness score suggests "
+            f"{'a diverse vocabulary' if metrics['vocabulary_richness'] > 50 else 'some repetition in word choice'}.\n\n"
+            f"The average sentence length is "
+            f"{'quite long' if metrics['avg_sentence_length'] > 20 else 'moderate' if metrics['avg_sentence_length'] > 15 else 'concise'}."
+        )
+        pdf.multi_cell(0, 10, interpretation_text)
+
+        # How the tone changes through the document
+        sections = metrics.get('sections') or []
+        windows = metrics.get('windows') or []
+        if len(sections) > 1 or len(windows) > 1:
             pdf.ln(10)
-            
-            # Interpretation
-            formality = "very formal" if metrics['formality'] > 75 else "formal" if metrics['formality'] > 60 else "neutral" if metrics['formality'] > 40 else "informal" if metrics['formality'] > 25 else "very informal"
-            descriptiveness = "highly descriptive" if metrics['descriptiveness'] > 75 else "moderately descriptive" if metrics['descriptiveness'] > 50 else "somewhat descriptive" if metrics['descriptiveness'] > 25 else "minimally descriptive"
-            sentiment = "very positive" if metrics['sentiment'] > 75 else "positive" if metrics['sentiment'] > 60 else "neutral" if metrics['sentiment'] > 40 else "negative" if metrics['sentiment'] > 25 else "very negative"
-            
-            interpretation_text = (
-                f"The text appears to be {formality} in tone, {descriptiveness} in detail, "
-                f"and {sentiment} in emotional tone.\n\n"
-                f"The vocabulary richness score suggests "
-                f"{'a diverse vocabulary' if metrics['vocabulary_richness'] > 50 else 'some repetition in word choice'}.\n\n"
-                f"The average sentence length is "
-                f"{'quite long' if metrics['avg_sentence_length'] > 20 else 'moderate' if metrics['avg_sentence_length'] > 15 else 'concise'}."
-            )
-            pdf.multi_cell(0, 10, interpretation_text)
-        
-        try:
-            return pdf.output(dest='S').encode('latin1', 'replace')
-        except Exception:
-            # If encoding fails, try a more aggressive replacement strategy
-            return pdf.output(dest='S').encode('ascii', 'replace') 
\ No newline at end of file
+            pdf.issue_header("Tone Through the Document")
+        if len(windows) > 1:
+            most = max(windows, key=lambda window: window['formality'])
+            least = min(windows, key=lambda window: window['formality'])
+            pdf.multi_cell(0, 10, sanitize_text(
+                f"Over {metrics['window_words']}-word stretches, formality ranges from "
+                f"{least['formality']:.1f}% ({least['label'].lower()}) to "
+                f"{most['formality']:.1f}% ({most['label'].lower()})."
+            ))
+        if len(sections) > 1:
+            for section in sections:
+                pdf.cell(0, 10, sanitize_text(
+                    f"{section['label']}: formality {section['formality']:.1f}%, "
+                    f"descriptiveness {section['descriptiveness']:.1f}% ({section['words']} words)"
+                ), ln=True)
+
+    try:
+        return pdf.output(dest='S').encode('latin1', 'replace')
+    except Exception:
+        # If encoding fails, try a more aggressive replacement strategy
+        return pdf.output(dest='S').encode('ascii', 'replace')
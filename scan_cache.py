@@ -0,0 +1,91 @@
+import hashlib
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+MISSING = object()
+
+
+def content_hash(data: bytes) -> str:
+    """Address of an uploaded file's contents"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def artifact_key(*parts) -> str:
+    """Cache key for a stage output: the content hash plus every setting and
+    version the output depends on"""
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+
+class ArtifactCache:
+    """Pipeline artifacts pickled to local disk, one file per stage and key.
+
+    Each stage (extracted text, token index, tone metrics, issue lists) is
+    stored on its own, so a change that only affects one stage leaves the
+    others cached. When the directory grows past `max_bytes` the least
+    recently used entries are removed.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, stage: str, key: str) -> Path:
+        return self.root / stage / f"{key}.pkl"
+
+    def get(self, stage: str, key: str):
+        """The cached artifact, or MISSING"""
+        path = self._path(stage, key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return MISSING
+        try:
+            os.utime(path)  # Mark as recently used for eviction
+        except OSError:
+            pass
+        return value
+
+    def put(self, stage: str, key: str, value: Any):
+        path = self._path(stage, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except (OSError, pickle.PicklingError):
+            tmp_path.unlink(missing_ok=True)
+            return
+        self._evict()
+
+    def get_or_compute(self, stage: str, key: str, compute: Callable[[], Any]):
+        value = self.get(stage, key)
+        if value is MISSING:
+            value = compute()
+            self.put(stage, key, value)
+        return value
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.root.glob("*/*.pkl"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
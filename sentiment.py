@@ -0,0 +1,158 @@
+import re
+import threading
+from importlib import resources
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from xml.etree import ElementTree
+
+from text_index import TextIndex
+
+# The polarity lexicon TextBlob's default (pattern) analyzer uses
+LEXICON_PATH = Path(str(resources.files("textblob") / "en" / "en-sentiment.xml"))
+
+NEGATIONS = {"no", "not", "n't", "never"}
+# Clitics split off their word, so "isn't" is "is" plus a negation. TextBlob's
+# tokenizer breaks contractions up as "isn ' t" instead and misses the
+# negation, scoring "isn't great" like "great".
+CLITICS = ("n't", "'d", "'m", "'s", "'ll", "'re", "'ve")
+# An exclamation mark strengthens the word before it by this much
+EXCLAMATION_BOOST = 1.25
+
+
+class SentimentLexicon(NamedTuple):
+    """Polarity lexicon, loaded once"""
+    words: Dict[str, Tuple[float, float]]  # word -> (polarity, intensity)
+    modifiers: Set[str]  # Known adverbs, which scale the next known word
+
+
+def _average(values: List[Tuple[float, ...]]) -> List[float]:
+    return [sum(column) / len(column) for column in zip(*values)]
+
+
+def load_lexicon(path: Path = LEXICON_PATH) -> SentimentLexicon:
+    """Read the lexicon the way TextBlob does: senses averaged per part of
+    speech, then across parts of speech, plus a derived "-ly" adverb for
+    every adjective ("terrible" -> "terribly")"""
+    senses: Dict[str, Dict[Optional[str], List[Tuple[float, float, float]]]] = {}
+    for word in ElementTree.parse(path).getroot().iter("word"):
+        form = word.get("form")
+        if form:
+            scores = (
+                float(word.get("polarity", 0.0)),
+                float(word.get("subjectivity", 0.0)),
+                float(word.get("intensity", 1.0)),
+            )
+            senses.setdefault(form, {}).setdefault(word.get("pos"), []).append(scores)
+
+    by_pos: Dict[str, Dict[Optional[str], List[float]]] = {}
+    for form, pos_senses in senses.items():
+        averaged = {pos: _average(scores) for pos, scores in pos_senses.items()}
+        averaged[None] = _average(list(averaged.values()))
+        by_pos[form] = averaged
+    for form, averaged in list(by_pos.items()):
+        if "JJ" in averaged:
+            stem = form[:-1] + "i" if form.endswith("y") else form
+            stem = stem[:-2] if stem.endswith("le") else stem
+            adverb = by_pos.setdefault(stem + "ly", {})
+            adverb["RB"] = adverb[None] = averaged["JJ"]
+
+    return SentimentLexicon(
+        words={form: (averaged[None][0], averaged[None][2]) for form, averaged in by_pos.items()},
+        modifiers={form for form, averaged in by_pos.items() if "RB" in averaged},
+    )
+
+
+_lexicon: Optional[SentimentLexicon] = None
+_lexicon_lock = threading.Lock()
+
+
+def get_lexicon() -> SentimentLexicon:
+    """The process-wide lexicon, loaded on first use"""
+    global _lexicon
+    with _lexicon_lock:
+        if _lexicon is None:
+            _lexicon = load_lexicon()
+        return _lexicon
+
+
+def _split_clitic(word: str) -> List[str]:
+    for clitic in CLITICS:
+        if word.endswith(clitic) and len(word) > len(clitic):
+            return [word[:-len(clitic)], clitic]
+    return [word]
+
+
+def polarity(index: TextIndex, lexicon: Optional[SentimentLexicon] = None) -> float:
+    """Average polarity (-1 to 1) of the document's opinion words, scored as
+    TextBlob's default analyzer does, straight from the token index.
+
+    A known adverb scales the next known word by its intensity ("really
+    good"), and a negation up to a few small words earlier flips and halves
+    it ("not a good" = slightly bad). Exclamation marks strengthen the word
+    before them. Unlike TextBlob, negated contractions count as negations
+    ("isn't good" is slightly bad), and negations and modifiers don't carry
+    over into the next sentence (a line break inside a sentence doesn't end
+    it).
+    """
+    lexicon = lexicon or get_lexicon()
+    words, modifiers = lexicon.words, lexicon.modifiers
+    text = index.text
+    exclamations = [match.start() for match in re.finditer('!', text)]
+    next_mark = 0
+
+    # Each assessment is [polarity, intensity, negated]
+    assessments: List[list] = []
+    modifier: Optional[str] = None  # Preceding known adverb
+    negation: Optional[str] = None  # Preceding negation
+    sentence = None
+    tokens = index.tokens
+    for position, token in enumerate(tokens):
+        if token.full_sentence != sentence:
+            sentence = token.full_sentence
+            modifier = negation = None
+        for word in _split_clitic(token.norm):
+            known = words.get(word)
+            if known is not None:
+                word_polarity, intensity = known
+                if modifier is None:
+                    assessments.append([word_polarity, intensity, False])
+                else:
+                    current = assessments[-1]
+                    current[0] = max(-1.0, min(word_polarity * current[1], 1.0))
+                    current[1] = intensity
+                if negation is not None:
+                    assessments[-1][1] = 1.0 / assessments[-1][1]
+                    assessments[-1][2] = True
+                modifier = word if word in modifiers else None
+                negation = word if word in NEGATIONS else None
+                continue
+
+            if word in NEGATIONS:
+                negation = word
+            elif negation and len(word.strip("'")) > 1:
+                # Negations carry across small words ("not a good")
+                negation = None
+            if negation is not None and modifier is not None and modifier.endswith("ly"):
+                # "really not good"
+                assessments[-1][2] = True
+                negation = None
+            elif modifier and len(word) > 2:
+                # So do modifiers ("really is a good")
+                modifier = None
+
+        # Exclamation marks between this word and the next
+        following = tokens[position + 1].start if position + 1 < len(tokens) else len(text)
+        while next_mark < len(exclamations) and exclamations[next_mark] < following:
+            if exclamations[next_mark] >= token.end and assessments:
+                assessments[-1][0] = max(-1.0, min(assessments[-1][0] * EXCLAMATION_BOOST, 1.0))
+            next_mark += 1
+
+    if not assessments:
+        return 0.0
+    # "not good" = slightly bad, "not bad" = slightly good
+    return sum(p * -0.5 if negated else p for p, _, negated in assessments) / len(assessments)
+
+
+def sentiment_score(index: TextIndex) -> float:
+    """Document sentiment on a 0-100 scale (50 is neutral)"""
+    return (polarity(index) + 1) / 2 * 100  # Scale from -1:1 to 0:100
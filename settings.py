@@ -0,0 +1,28 @@
+import os
+from pathlib import Path
+
+import streamlit as st
+
+# Local on-disk caches (spelling suggestions, scan artifacts, ...)
+CACHE_DIR = Path(__file__).parent / ".cache"
+
+
+def get_setting(name: str, default=None):
+    """Read an app setting.
+
+    Settings live in the `[copy_checker]` section of `.streamlit/secrets.toml`
+    and can be overridden with an `RN_<NAME>` environment variable. Values
+    from the environment are converted to the type of `default`.
+    """
+    value = os.environ.get(f"RN_{name.upper()}")
+    if value is None:
+        try:
+            return st.secrets["copy_checker"][name]
+        except Exception:
+            return default
+
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, (int, float)):
+        return type(default)(value)
+    return value
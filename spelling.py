@@ -0,0 +1,338 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+import spellchecker
+from spellchecker import SpellChecker
+
+from settings import CACHE_DIR, get_setting
+
+SUGGESTION_DB = CACHE_DIR / "spelling_suggestions.sqlite3"
+
+ENGINES = ("pyspellchecker", "symspell")
+
+_MISSING = object()
+
+
+class SuggestionCache:
+    """Spelling suggestions memoized in memory (LRU) and on disk (sqlite).
+
+    Entries are keyed by word and dictionary version, so suggestions computed
+    by one session are reused by every other session and survive restarts,
+    and a dictionary upgrade never serves stale suggestions.
+    """
+
+    def __init__(self, path: Path, dictionary_version: str, max_entries: int = 20000):
+        self.dictionary_version = dictionary_version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Optional[List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS suggestions ("
+            " dictionary_version TEXT NOT NULL,"
+            " word TEXT NOT NULL,"
+            " suggestions TEXT,"
+            " PRIMARY KEY (dictionary_version, word))"
+        )
+        self._db.commit()
+
+    def get(self, word: str):
+        """Cached suggestions for a word, or `_MISSING` if not cached"""
+        with self._lock:
+            if word in self._memory:
+                self._memory.move_to_end(word)
+                self.hits += 1
+                return self._memory[word]
+
+            row = self._db.execute(
+                "SELECT suggestions FROM suggestions WHERE dictionary_version = ? AND word = ?",
+                (self.dictionary_version, word),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return _MISSING
+
+            self.hits += 1
+            suggestions = json.loads(row[0]) if row[0] is not None else None
+            self._remember(word, suggestions)
+            return suggestions
+
+    def put(self, word: str, suggestions: Optional[List[str]]):
+        with self._lock:
+            self._remember(word, suggestions)
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO suggestions VALUES (?, ?, ?)",
+                    (
+                        self.dictionary_version,
+                        word,
+                        json.dumps(suggestions) if suggestions is not None else None,
+                    ),
+                )
+                self._db.commit()
+            except sqlite3.OperationalError:
+                # Another process holds the write lock; the in-memory copy is
+                # enough for this session
+                pass
+
+    def _remember(self, word: str, suggestions: Optional[List[str]]):
+        self._memory[word] = suggestions
+        self._memory.move_to_end(word)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counts since the process started"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "in_memory": len(self._memory),
+            }
+
+
+class SymSpellChecker:
+    """Spelling engine using a precomputed symmetric-delete index (SymSpell).
+
+    Every dictionary word is indexed under all strings reachable from its
+    first `prefix_length` letters by up to `max_distance` deletions. A query
+    only generates the deletions of the misspelled word and looks them up, so
+    it costs the same however long the dictionary is, instead of generating
+    every possible edit like pyspellchecker does.
+
+    The index is built once from the pyspellchecker dictionary and stored in
+    an sqlite file, so later processes just open it.
+    """
+
+    def __init__(self, path: Path, words: Optional[Dict[str, int]] = None,
+                 max_distance: int = 2, prefix_length: int = 7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        if not path.exists():
+            if words is None:
+                words = SpellChecker().word_frequency.dictionary
+            self._build(path, words)
+
+        self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._words: List[str] = []
+        self._counts: Dict[str, int] = {}
+        for word, count in self._db.execute("SELECT word, count FROM words ORDER BY id"):
+            self._words.append(word)
+            self._counts[word] = count
+
+    def _build(self, path: Path, words: Dict[str, int]):
+        index: Dict[str, List[int]] = {}
+        ordered = sorted(words)
+        for word_id, word in enumerate(ordered):
+            for key in _deletes(word[:self.prefix_length], self.max_distance):
+                index.setdefault(key, []).append(word_id)
+
+        # Build under a temporary name so a concurrent session never opens a
+        # half-written index
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        db = sqlite3.connect(str(tmp_path))
+        db.execute("CREATE TABLE words (id INTEGER PRIMARY KEY, word TEXT, count INTEGER)")
+        db.execute("CREATE TABLE deletes (key TEXT PRIMARY KEY, word_ids TEXT)")
+        db.executemany(
+            "INSERT INTO words VALUES (?, ?, ?)",
+            ((word_id, word, words[word]) for word_id, word in enumerate(ordered)),
+        )
+        db.executemany(
+            "INSERT INTO deletes VALUES (?, ?)",
+            ((key, ",".join(map(str, ids))) for key, ids in index.items()),
+        )
+        db.commit()
+        db.close()
+        os.replace(tmp_path, path)
+
+    def unknown(self, words: Iterable[str]) -> Set[str]:
+        return {word.lower() for word in words if word.lower() not in self._counts}
+
+    def candidates(self, word: str) -> Optional[List[str]]:
+        """Nearest dictionary words, most frequent first (None if none are
+        within `max_distance` edits)"""
+        word = word.lower()
+        if word in self._counts:
+            return [word]
+
+        keys = list(_deletes(word[:self.prefix_length], self.max_distance))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT word_ids FROM deletes WHERE key IN ({','.join('?' * len(keys))})",
+                keys,
+            ).fetchall()
+
+        best = self.max_distance
+        found: List[str] = []
+        seen = set()
+        for (word_ids,) in rows:
+            for word_id in word_ids.split(","):
+                if word_id in seen:
+                    continue
+                seen.add(word_id)
+                candidate = self._words[int(word_id)]
+                if abs(len(candidate) - len(word)) > best:
+                    continue
+                distance = _edit_distance(word, candidate, best)
+                if distance < best or not found and distance == best:
+                    best = distance
+                    found = [candidate]
+                elif distance == best:
+                    found.append(candidate)
+
+        if not found:
+            return None
+        return sorted(found, key=lambda w: (-self._counts[w], w))
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """The word plus every string reachable by up to `max_distance` deletions"""
+    found = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {
+            shorter[:i] + shorter[i + 1:]
+            for shorter in frontier if len(shorter) > 1
+            for i in range(len(shorter))
+        }
+        found |= frontier
+    return found
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Damerau-Levenshtein distance, or `limit + 1` if it exceeds `limit`.
+
+    Unrestricted, so edits can follow a transposition ("ardkill" ->
+    "roadkill" is 2): the same words pyspellchecker reaches by chaining two
+    single edits.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # Lowrance-Wagner: rows and columns are shifted by one, with a border of
+    # `infinity` so transpositions never reach past the start of either word
+    infinity = len(a) + len(b)
+    rows = [[infinity] * (len(b) + 2)]
+    rows += [[infinity] + list(range(len(b) + 1))]
+    last_row: Dict[str, int] = {}  # Letter -> last row of `a` it appeared in
+    for i in range(1, len(a) + 1):
+        row = [infinity, i] + [0] * len(b)
+        last_match_column = 0
+        for j in range(1, len(b) + 1):
+            k = last_row.get(b[j - 1], 0)
+            l = last_match_column
+            if a[i - 1] == b[j - 1]:
+                cost = 0
+                last_match_column = j
+            else:
+                cost = 1
+            row[j + 1] = min(
+                rows[i][j] + cost,  # Substitution (or match)
+                row[j] + 1,  # Insertion
+                rows[i][j + 1] + 1,  # Deletion
+                rows[k][l] + (i - k - 1) + 1 + (j - l - 1),  # Transposition
+            )
+        rows.append(row)
+        last_row[a[i - 1]] = i
+    distance = rows[-1][-1]
+    return distance if distance <= limit else limit + 1
+
+
+class CachedSpellChecker:
+    """A spell checker whose `candidates` results go through a SuggestionCache.
+
+    Candidates are returned most frequent first, so taking the first few gives
+    the most likely corrections.
+    """
+
+    def __init__(self, spell, cache: SuggestionCache):
+        self.spell = spell
+        self.cache = cache
+
+    def unknown(self, words: Iterable[str]) -> Set[str]:
+        return self.spell.unknown(words)
+
+    def candidates(self, word: str) -> Optional[List[str]]:
+        suggestions = self.cache.get(word)
+        if suggestions is _MISSING:
+            found = self.spell.candidates(word)
+            if isinstance(self.spell, SpellChecker) and found:
+                found = sorted(found, key=lambda w: (-self.spell.word_usage_frequency(w), w))
+            suggestions = list(found) if found else None
+            self.cache.put(word, suggestions)
+        return suggestions
+
+
+def dictionary_version(spell: SpellChecker) -> str:
+    """Identifies the dictionary contents that suggestions were computed from"""
+    frequency = spell.word_frequency
+    return (
+        f"pyspellchecker-{spellchecker.__version__}"
+        f"-{frequency.unique_words}-{frequency.total_words}"
+    )
+
+
+_checkers: Dict[str, CachedSpellChecker] = {}
+_checker_lock = threading.Lock()
+
+
+def get_spell_checker(engine: Optional[str] = None) -> CachedSpellChecker:
+    """The process-wide spell checker shared by every Streamlit session.
+
+    The engine comes from the `spell_engine` setting unless given explicitly.
+    """
+    engine = engine or get_setting("spell_engine", "pyspellchecker")
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown spell engine '{engine}'. Expected one of: {', '.join(ENGINES)}")
+
+    with _checker_lock:
+        if engine not in _checkers:
+            spell = SpellChecker()
+            version = dictionary_version(spell)
+            if engine == "symspell":
+                symspell = SymSpellChecker(
+                    CACHE_DIR / f"symspell-{version}.sqlite3",
+                    words=spell.word_frequency.dictionary,
+                )
+                # "dl" (unrestricted Damerau-Levenshtein) keeps suggestions
+                # cached under the earlier distance from being reused
+                cache = SuggestionCache(SUGGESTION_DB, f"symspell-dl-{version}")
+                _checkers[engine] = CachedSpellChecker(symspell, cache)
+            else:
+                cache = SuggestionCache(SUGGESTION_DB, version)
+                _checkers[engine] = CachedSpellChecker(spell, cache)
+        return _checkers[engine]
+
+
+def spelling_suggestions(word: str) -> str:
+    """Top suggestions for a misspelled word, as shown in the review UI"""
+    suggestions = get_spell_checker().candidates(word)
+    if suggestions:
+        return ", ".join(list(suggestions)[:3])  # Take top 3 suggestions
+    return "No suggestions available"
+
+
+def hyphenated_suggestions(misspelled_parts: Sequence[str]) -> str:
+    """Suggestions for the misspelled parts of a hyphenated word"""
+    spell = get_spell_checker()
+    suggestions_by_part = {}
+    for part in misspelled_parts:
+        suggestions = spell.candidates(part)
+        if suggestions:
+            suggestions_by_part[part] = list(suggestions)[:3]
+
+    return "Possible issues in parts: " + ", ".join(
+        f"{part}: {', '.join(suggs)}"
+        for part, suggs in suggestions_by_part.items()
+    )
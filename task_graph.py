@@ -0,0 +1,43 @@
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from typing import Any, Callable, Dict, Sequence, Tuple
+
+# Task name -> (names of the tasks it needs, function taking their results)
+TaskGraph = Dict[str, Tuple[Sequence[str], Callable[..., Any]]]
+
+
+def run_task_graph(executor: Executor, tasks: TaskGraph,
+                   on_done: Callable[[str, Any], None] = None) -> Dict[str, Any]:
+    """Run tasks on `executor` as soon as the tasks they depend on finish.
+
+    Scheduling happens on the calling thread, so workers never block waiting
+    for each other, and `on_done(name, result)` is called on the calling
+    thread as each task completes (safe for updating Streamlit state).
+    Returns every task's result by name.
+    """
+    results: Dict[str, Any] = {}
+    pending = dict(tasks)
+    running = {}
+
+    def submit_ready():
+        for name, (deps, fn) in list(pending.items()):
+            if all(dep in results for dep in deps):
+                del pending[name]
+                running[executor.submit(fn, *(results[dep] for dep in deps))] = name
+
+    submit_ready()
+    try:
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name] = future.result()
+                if on_done:
+                    on_done(name, results[name])
+            submit_ready()
+    finally:
+        for future in running:
+            future.cancel()
+
+    if pending:
+        raise ValueError(f"Tasks with unmet dependencies: {', '.join(pending)}")
+    return results
@@ -0,0 +1,29 @@
+import pytest
+from textblob import TextBlob
+
+from sentiment import polarity
+from text_index import TextIndex
+
+
+@pytest.mark.parametrize("text", [
+    "The results were good.",
+    "The results were not good at all.",
+    "The results were not\ngood at all.",
+    "It was really\nbad.",
+    "What a wonderful, truly amazing day!",
+    "Not a good plan. A great team though.",
+])
+def test_polarity_matches_textblob(text):
+    assert polarity(TextIndex(text)) == pytest.approx(TextBlob(text).sentiment.polarity)
+
+
+def test_negated_contractions_differ_from_textblob():
+    """TextBlob misses the negation in "isn't"; the index scores it"""
+    text = "It isn't great."
+    assert TextBlob(text).sentiment.polarity == pytest.approx(0.8)
+    assert polarity(TextIndex(text)) == pytest.approx(polarity(TextIndex("It is not great.")))
+    assert polarity(TextIndex(text)) < 0
+
+
+def test_negations_stop_at_sentence_end():
+    assert polarity(TextIndex("No. Good")) == pytest.approx(polarity(TextIndex("Good")))
@@ -0,0 +1,44 @@
+import random
+import string
+
+from spellchecker import SpellChecker
+
+from spelling import SymSpellChecker
+
+
+def _typo(word: str, rng: random.Random, edits: int) -> str:
+    """`word` with `edits` random single edits, applied one after another"""
+    for _ in range(edits):
+        i = rng.randrange(len(word) + 1)
+        letter = rng.choice(string.ascii_lowercase)
+        edit = rng.choice(("delete", "transpose", "replace", "insert"))
+        if edit == "delete" and i < len(word) and len(word) > 1:
+            word = word[:i] + word[i + 1:]
+        elif edit == "transpose" and i < len(word) - 1:
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+        elif edit == "replace" and i < len(word):
+            word = word[:i] + letter + word[i + 1:]
+        else:
+            word = word[:i] + letter + word[i:]
+    return word
+
+
+def test_symspell_matches_pyspellchecker(tmp_path):
+    """SymSpell finds exactly the candidates pyspellchecker does"""
+    rng = random.Random(0)
+    reference = SpellChecker()
+    dictionary = reference.word_frequency.dictionary
+    words = dict(rng.sample(sorted(dictionary.items()), 20000))
+    words.update({"roadkill": 1, "crisps": 1})
+    reference = SpellChecker(language=None)
+    reference.word_frequency.load_json(words)
+    symspell = SymSpellChecker(tmp_path / "symspell.sqlite3", words=words)
+
+    typos = ["ardkill", "crissip"] + [
+        # pyspellchecker takes about a second per long word
+        _typo(word, rng, rng.choice((1, 2))) for word in rng.sample(sorted(words), 150) if len(word) <= 8
+    ]
+    for typo in typos:
+        expected = reference.candidates(typo)
+        found = symspell.candidates(typo)
+        assert (set(found) if found else None) == expected, typo
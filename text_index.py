@@ -0,0 +1,182 @@
+import re
+from bisect import bisect_right
+from collections import defaultdict
+from heapq import merge
+from typing import Dict, List, NamedTuple, Tuple
+
+# Same word shape as the original tokenizer: letters, optionally joined by an
+# apostrophe or hyphen. Matched case-insensitively against the raw text so the
+# recorded offsets always point into the original document.
+WORD_PATTERN = r"[a-z]+(?:['\-][a-z]+)*"
+
+# One pass over the document picks up words, em/en dashes, paragraph breaks
+# and sentence breaks (sentence-ending punctuation followed by whitespace).
+_SCAN = re.compile(
+    rf"(?P<word>{WORD_PATTERN})"
+    r"|(?P<dash>[—–])"
+    r"|(?<=[.!?])(?P<stop>\s+)"
+    r"|(?P<newline>\n)",
+    re.IGNORECASE,
+)
+_PART_SPLIT = re.compile(r"['\-]")
+
+Span = Tuple[int, int]
+
+
+class Token(NamedTuple):
+    """A single word in the document"""
+    start: int
+    end: int
+    norm: str  # Lowercased form used for lookups
+    paragraph: int
+    sentence: int  # Starts again at every line break too
+    # Counts only breaks after sentence-ending punctuation, so a sentence
+    # wrapped over several lines (as PDF text is) keeps one number
+    full_sentence: int
+
+
+class TextIndex:
+    """Token stream and inverted index for a document, built once per scan.
+
+    Every check locates its occurrences through this index instead of running
+    its own regex over the raw text.
+
+    The index can also be built incrementally while the document is still
+    being extracted: start from ``TextIndex()``, `extend` it with each chunk of
+    text as it arrives, then call `finish`.
+    """
+
+    def __init__(self, text: str = ""):
+        self._chunks: List[str] = []
+        self.tokens: List[Token] = []
+        self.dashes: List[Span] = []
+        self.paragraph_starts: List[int] = [0]
+        self.sentence_starts: List[int] = [0]
+        # Breaks after sentence-ending punctuation only (not bare line
+        # breaks), which is how tone analysis counts sentences
+        self.stop_count = 0
+
+        # Normalized word -> token numbers of whole-token occurrences
+        self._positions: Dict[str, List[int]] = defaultdict(list)
+        # Normalized word -> spans where it appears as part of a hyphenated
+        # word or contraction (e.g. "class" in "world-class")
+        self._part_spans: Dict[str, List[Span]] = defaultdict(list)
+        # Text not indexed yet, kept apart so each chunk is only scanned once.
+        # It starts one character early (from `_tail_skip`) so sentence breaks
+        # can see the punctuation before them.
+        self._tail = ""
+        self._tail_start = 0
+        self._tail_skip = 0
+
+        if text:
+            self.extend(text)
+            self.finish()
+
+    @property
+    def text(self) -> str:
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def extend(self, chunk: str):
+        """Append text to the document and index everything that can't be
+        changed by text still to come"""
+        self._chunks.append(chunk)
+        self._tail += chunk
+        self._scan(final=False)
+
+    def finish(self):
+        """Index the rest of the document once all text has been added"""
+        self._scan(final=True)
+
+    def _scan(self, final: bool):
+        window = self._tail
+        base = self._tail_start
+        text_length = base + len(window)
+        for match in _SCAN.finditer(window, self._tail_skip):
+            # A word or whitespace run that reaches the end of the text so far
+            # may continue in the next chunk, so leave it for the next scan
+            if not final and match.end() + 1 >= len(window):
+                keep = max(match.start() - 1, 0)
+                self._tail = window[keep:]
+                self._tail_start = base + keep
+                self._tail_skip = match.start() - keep
+                return
+            kind = match.lastgroup
+            start, end = base + match.start(), base + match.end()
+            if kind == "word":
+                norm = match.group().lower()
+                self._positions[norm].append(len(self.tokens))
+                self.tokens.append(Token(
+                    start, end, norm, len(self.paragraph_starts) - 1,
+                    len(self.sentence_starts) - 1, self.stop_count,
+                ))
+                if "-" in norm or "'" in norm:
+                    self._index_parts(norm, start)
+            elif kind == "dash":
+                self.dashes.append((start, end))
+            else:
+                # Sentence breaks may swallow line breaks, so count the
+                # newlines in either kind of whitespace run
+                newlines = match.group().count("\n")
+                if newlines:
+                    self.paragraph_starts.extend([end] * newlines)
+                if (kind == "stop" or newlines) and end < text_length:
+                    self.sentence_starts.append(end)
+                    if kind == "stop":
+                        self.stop_count += 1
+        self._tail = window[-1:]
+        self._tail_start = text_length - len(self._tail)
+        self._tail_skip = len(self._tail)
+
+    def _index_parts(self, norm: str, start: int):
+        offset = start
+        for part in _PART_SPLIT.split(norm):
+            self._part_spans[part].append((offset, offset + len(part)))
+            offset += len(part) + 1
+
+    # --- Lookups ---
+
+    def words(self) -> List[str]:
+        """All normalized words in document order (with duplicates)"""
+        return [token.norm for token in self.tokens]
+
+    def vocabulary(self) -> List[str]:
+        """Distinct normalized words"""
+        return list(self._positions)
+
+    def positions(self, word: str) -> List[int]:
+        """Token numbers where `word` occurs as a whole token"""
+        return self._positions.get(word.lower(), [])
+
+    def token_spans(self, word: str) -> List[Span]:
+        """Spans where `word` occurs as a whole token"""
+        tokens = self.tokens
+        return [(tokens[i].start, tokens[i].end) for i in self.positions(word)]
+
+    def spans(self, word: str) -> List[Span]:
+        """Spans where `word` occurs on word boundaries, including as part of
+        a hyphenated word or contraction"""
+        word = word.lower()
+        whole = self.token_spans(word)
+        parts = self._part_spans.get(word)
+        if not parts:
+            return whole
+        return list(merge(whole, parts))
+
+    def paragraph_of(self, offset: int) -> int:
+        """Paragraph number containing a character offset"""
+        return bisect_right(self.paragraph_starts, offset) - 1
+
+    def sentence_of(self, offset: int) -> int:
+        """Sentence number containing a character offset"""
+        return bisect_right(self.sentence_starts, offset) - 1
+
+    @property
+    def word_count(self) -> int:
+        return len(self.tokens)
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentence_starts)
+
@@ -0,0 +1,504 @@
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from extraction import OffsetMap
+from sentiment import sentiment_score
+from text_index import TextIndex
+
+# --- Lexicon ---
+# Every word list the tone scores use, compiled below into one lookup table
+
+# Casual words
+INFORMAL_VOCABULARY = {
+    'like', 'just', 'maybe', 'kinda', 'sorta', 'gonna', 'gotta', 'wanna',
+    'lots', 'stuff', 'thing', 'things', 'pretty', 'really', 'very', 'super',
+    'totally', 'basically', 'actually', 'literally', 'honestly', 'seriously',
+    'awesome', 'amazing', 'cool', 'huge', 'tiny', 'massive', 'epic',
+    'okay', 'ok', 'yeah', 'yep', 'nope', 'hey', 'guys', 'folks',
+    'crazy', 'insane', 'wild', 'sick', 'sweet', 'dope', 'rad',
+    'whatever', 'anyways', 'dunno', 'lemme', 'gimme'
+}
+
+# Interjections and exclamatory words
+INTERJECTIONS = {
+    'wow', 'oh', 'ah', 'ugh', 'hmm', 'oops', 'yay', 'hooray',
+    'alas', 'darn', 'gosh', 'jeez', 'phew', 'whoa', 'bam', 'boom'
+}
+
+# Formal/business vocabulary (rewards formality)
+FORMAL_VOCABULARY = {
+    'regarding', 'concerning', 'pertaining', 'submit', 'forthcoming', 'pursuant',
+    'heretofore', 'henceforth', 'notwithstanding', 'nevertheless', 'furthermore',
+    'consequently', 'therefore', 'accordingly', 'subsequently', 'moreover',
+    'demonstrate', 'indicate', 'suggest', 'propose', 'conclude', 'establish',
+    'implement', 'utilize', 'facilitate', 'determine', 'ascertain', 'endeavor',
+    'commence', 'terminate', 'acquire', 'procure', 'obtain', 'maintain',
+    'substantial', 'significant', 'considerable', 'appropriate', 'adequate',
+    'sufficient', 'comprehensive', 'extensive', 'preliminary', 'subsequent'
+}
+
+# Personal pronouns (context-dependent penalty)
+PERSONAL_PRONOUNS = {'i', 'you', 'we', 'me', 'us', 'my', 'your', 'our'}
+
+# Sensory and emotive adjectives/adverbs (weighted higher)
+SENSORY_EMOTIVE_WORDS = {
+    # Visual
+    'golden', 'vivid', 'bright', 'brilliant', 'gleaming', 'shimmering', 'radiant',
+    'dazzling', 'luminous', 'glowing', 'sparkling', 'crystalline', 'translucent',
+    'shadowy', 'gloomy', 'dim', 'murky', 'hazy', 'blurred', 'sharp', 'crisp',
+
+    # Tactile
+    'smooth', 'rough', 'silky', 'velvety', 'coarse', 'tender', 'soft', 'hard',
+    'warm', 'cool', 'freezing', 'burning', 'sticky', 'slippery', 'dry', 'moist',
+
+    # Auditory
+    'thunderous', 'whispered', 'melodic', 'harsh', 'gentle', 'piercing', 'muffled',
+    'resonant', 'echoing', 'silent', 'deafening', 'rhythmic', 'harmonious',
+
+    # Olfactory/Gustatory
+    'fragrant', 'aromatic', 'pungent', 'sweet', 'bitter', 'sour', 'fresh', 'stale',
+    'savory', 'spicy', 'bland', 'rich', 'delicate', 'robust',
+
+    # Emotional/Atmospheric
+    'serene', 'tranquil', 'chaotic', 'peaceful', 'turbulent', 'mysterious',
+    'enchanting', 'haunting', 'melancholy', 'joyful', 'somber', 'vibrant',
+    'dramatic', 'subtle', 'intense', 'gentle', 'fierce', 'delicate',
+
+    # Adverbs
+    'gracefully', 'effortlessly', 'dramatically', 'gently', 'fiercely', 'subtly',
+    'vividly', 'brilliantly', 'mysteriously', 'elegantly', 'powerfully', 'tenderly'
+}
+
+METAPHOR_INDICATORS = {
+    'bathed', 'drenched', 'flooded', 'swept', 'embraced', 'kissed', 'caressed',
+    'whispered', 'sang', 'danced', 'painted', 'carved', 'sculpted', 'woven'
+}
+
+# Feature bits a word can carry
+INFORMAL = 1
+INTERJECTION = 2
+FORMAL = 4
+PRONOUN = 8
+SENSORY = 16
+METAPHOR = 32
+
+# Sections shorter than this many words are merged into the next section of
+# the tone profile
+SECTION_MIN_WORDS = 150
+# A block this short that doesn't end like a sentence is taken as a heading
+HEADING_MAX_WORDS = 12
+# Words per sliding window; windows overlap by half
+DEFAULT_WINDOW_WORDS = 500
+
+# Splits hyphenated words and contractions into the words a regex \b sees
+_PART_SPLIT = re.compile(r"['\-]")
+
+# Contraction endings that count twice, as they did when each had its own
+# pattern (will, have, are, would/had)
+CONTRACTION_SUFFIXES = ("'ll", "'ve", "'re", "'d")
+
+
+def compile_lexicon() -> Dict[str, int]:
+    """Word -> bitmask of every feature the word has"""
+    lexicon: Dict[str, int] = {}
+    for words, bit in (
+        (INFORMAL_VOCABULARY, INFORMAL),
+        (INTERJECTIONS, INTERJECTION),
+        (FORMAL_VOCABULARY, FORMAL),
+        (PERSONAL_PRONOUNS, PRONOUN),
+        (SENSORY_EMOTIVE_WORDS, SENSORY),
+        (METAPHOR_INDICATORS, METAPHOR),
+    ):
+        for word in words:
+            lexicon[word] = lexicon.get(word, 0) | bit
+    return lexicon
+
+
+LEXICON = compile_lexicon()
+
+
+class TokenFeatures(NamedTuple):
+    """Tone features of every token, one array entry per token, so counts
+    for the whole document or any range of tokens are array sums"""
+    contractions: np.ndarray  # 1, or 2 with an 'll/'ve/'re/'d ending
+    informal: np.ndarray
+    interjections: np.ndarray
+    formal: np.ndarray
+    pronouns: np.ndarray
+    adjectives: np.ndarray
+    adverbs: np.ndarray
+    sensory: np.ndarray  # 2 per sensory adjective/adverb, 1 per metaphor
+    similes: np.ndarray  # Set on the first word of each simile
+
+
+class ToneFeatures(NamedTuple):
+    """Everything the tone scores are computed from"""
+    word_count: int
+    unique_word_count: int
+    sentence_count: int
+    contractions: int
+    informal: int
+    interjections: int
+    formal: int
+    pronouns: int
+    exclamations: int
+    adjectives: int
+    adverbs: int
+    sensory: int  # Weighted: 2 per sensory adjective/adverb, 1 per metaphor
+    similes: int
+
+
+def token_ids(index: TextIndex) -> Tuple[List[str], np.ndarray]:
+    """The document's vocabulary, and each token's position in it"""
+    vocabulary = index.vocabulary()
+    ids = np.empty(index.word_count, dtype=np.int32)
+    for word_id, word in enumerate(vocabulary):
+        ids[index.positions(word)] = word_id
+    return vocabulary, ids
+
+
+def tag_classes(tags: Optional[List[str]], word_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Whether each token is tagged as an adjective, and as an adverb"""
+    if not tags:
+        # Without POS tags there are no adjectives or adverbs to count
+        none = np.zeros(word_count, dtype=bool)
+        return none, none
+    # Classify each distinct tag once rather than every token
+    distinct, tag_ids = np.unique(np.array(tags, dtype=str), return_inverse=True)
+    adjective = np.char.startswith(distinct, 'JJ')
+    adverb = np.char.startswith(distinct, 'RB')
+    return adjective[tag_ids], adverb[tag_ids]
+
+
+def _whitespace_between(text: str, tokens, first: int, second: int) -> bool:
+    return text[tokens[first].end:tokens[second].start].isspace()
+
+
+def _find_similes(index: TextIndex, vocabulary: List[str], ids: np.ndarray) -> np.ndarray:
+    """Tokens starting "like a", "like <...ing>" or "as <word> as", with only
+    whitespace between the words.
+
+    Words end where a regex \b would end them, so an apostrophe or hyphen
+    also ends one: "un-like a-frame" is a simile, "as well-known as" and
+    "as we'll as" aren't (the middle word must be one plain word).
+
+    Candidates are picked out with array comparisons; only those (few) have
+    the text between their words checked.
+    """
+    similes = np.zeros(len(ids), dtype=bool)
+    if len(ids) < 2:
+        return similes
+    parts = [_PART_SPLIT.split(word) for word in vocabulary]
+    first = np.array([word_parts[0] for word_parts in parts])
+    last = np.array([word_parts[-1] for word_parts in parts])
+    plain = np.array([len(word_parts) == 1 for word_parts in parts], dtype=bool)
+    ing = np.array([len(part) > 3 and part.endswith("ing") for part in first], dtype=bool)
+
+    text, tokens = index.text, index.tokens
+    ends_like = (last == "like")[ids[:-1]]
+    following = ids[1:]
+    for i in np.flatnonzero(ends_like & ((first == "a")[following] | ing[following])):
+        if _whitespace_between(text, tokens, i, i + 1):
+            similes[i] = True
+
+    # Matches can't overlap, so an "as" that ends one can't start the next
+    after_last = 0
+    candidates = (last == "as")[ids[:-2]] & plain[ids[1:-1]] & (first == "as")[ids[2:]]
+    for i in np.flatnonzero(candidates):
+        if (i >= after_last and _whitespace_between(text, tokens, i, i + 1)
+                and _whitespace_between(text, tokens, i + 1, i + 2)):
+            similes[i] = True
+            after_last = i + 3
+    return similes
+
+
+def token_features(index: TextIndex, tags: Optional[List[str]] = None) -> TokenFeatures:
+    """Tone features of every token, computed from the vocabulary: each
+    distinct word is looked up once and the results gathered by token id.
+    `tags` are the tokens' POS tags (see `pos_tagging.tag_document`)."""
+    vocabulary, ids = token_ids(index)
+    bits = np.array([LEXICON.get(word, 0) for word in vocabulary], dtype=np.uint8)[ids]
+    contractions = np.array(
+        [("'" in word) + word.endswith(CONTRACTION_SUFFIXES) for word in vocabulary], dtype=np.int8
+    )[ids]
+    adjectives, adverbs = tag_classes(tags, len(ids))
+
+    # Formality: each word counts towards one indicator at most
+    informal = (bits & INFORMAL) > 0
+    interjections = ~informal & ((bits & INTERJECTION) > 0)
+    formal = ~informal & ~interjections & ((bits & FORMAL) > 0)
+    pronouns = ~informal & ~interjections & ~formal & ((bits & PRONOUN) > 0)
+
+    # Descriptiveness
+    sensory = np.where(
+        adjectives | adverbs,
+        np.where((bits & SENSORY) > 0, 2, 0),
+        np.where((bits & METAPHOR) > 0, 1, 0),
+    ).astype(np.int8)
+
+    return TokenFeatures(
+        contractions=contractions,
+        informal=informal,
+        interjections=interjections,
+        formal=formal,
+        pronouns=pronouns,
+        adjectives=adjectives,
+        adverbs=adverbs,
+        sensory=sensory,
+        similes=_find_similes(index, vocabulary, ids),
+    )
+
+
+def extract_features(index: TextIndex, features: Optional[TokenFeatures] = None) -> ToneFeatures:
+    """Every tone counter for the document, summed from the per-token
+    feature arrays"""
+    text = index.text
+    if features is None:
+        features = token_features(index)
+    return ToneFeatures(
+        word_count=index.word_count,
+        unique_word_count=len(index.vocabulary()),
+        sentence_count=index.stop_count + 1 if text.strip() else 0,
+        exclamations=text.count('!'),
+        **{name: int(values.sum()) for name, values in features._asdict().items()},
+    )
+
+
+class _PrefixSums:
+    """Cumulative per-token feature counts: the counts for any range of
+    tokens are two lookups, whatever its length"""
+
+    def __init__(self, features: TokenFeatures, exclamations: np.ndarray):
+        columns = dict(features._asdict(), exclamations=exclamations)
+        self._sums = {
+            name: np.concatenate(([0], np.cumsum(values, dtype=np.int64)))
+            for name, values in columns.items()
+        }
+
+    def features(self, first: int, last: int) -> ToneFeatures:
+        """Counts for tokens `first` to `last` (exclusive)"""
+        return ToneFeatures(
+            word_count=last - first,
+            # Not tracked per range (no score uses them)
+            unique_word_count=0,
+            sentence_count=0,
+            **{name: int(sums[last] - sums[first]) for name, sums in self._sums.items()},
+        )
+
+
+def _is_heading(text: str, words: int) -> bool:
+    """A short block that doesn't end like a sentence"""
+    text = text.rstrip()
+    return 0 < words <= HEADING_MAX_WORDS and bool(text) and text[-1] not in ".!?,;"
+
+
+def _section_starts(index: TextIndex, token_starts: np.ndarray,
+                    offsets: Optional[OffsetMap] = None) -> List[int]:
+    """First token of each section.
+
+    Sections follow the document's blocks (PDF text blocks and DOCX
+    paragraphs from `offsets`, otherwise lines). They start at headings when
+    the document has any; otherwise at any block. Sections shorter than
+    SECTION_MIN_WORDS are merged into the next (or, at the end, the previous)
+    one.
+    """
+    word_count = len(token_starts)
+    text = index.text
+    block_offsets = offsets.block_starts() if offsets is not None and len(offsets) else index.paragraph_starts
+    block_firsts = np.searchsorted(token_starts, block_offsets).tolist()
+    bounds = block_offsets[1:] + [len(text)]
+
+    blocks, headings = [], []
+    for i, first in enumerate(block_firsts):
+        last = block_firsts[i + 1] if i + 1 < len(block_firsts) else word_count
+        if first >= last or (blocks and blocks[-1] == first):
+            continue  # No words of its own
+        blocks.append(first)
+        if _is_heading(text[block_offsets[i]:bounds[i]], last - first):
+            headings.append(first)
+
+    def merge(candidates: List[int]) -> List[int]:
+        starts = [0]
+        for start in candidates:
+            if start - starts[-1] >= SECTION_MIN_WORDS:
+                starts.append(start)
+        if len(starts) > 1 and word_count - starts[-1] < SECTION_MIN_WORDS:
+            starts.pop()
+        return starts
+
+    starts = merge(headings)
+    return starts if len(starts) > 1 else merge(blocks)
+
+
+def _window_starts(word_count: int, window: int) -> List[int]:
+    """First token of each sliding window, half a window apart, with the
+    last one ending at the last word"""
+    if word_count <= window:
+        return [0]
+    starts = list(range(0, word_count - window + 1, max(1, window // 2)))
+    if starts[-1] + window < word_count:
+        starts.append(word_count - window)
+    return starts
+
+
+def tone_profile(index: TextIndex, features: TokenFeatures, offsets: Optional[OffsetMap] = None,
+                 window: int = DEFAULT_WINDOW_WORDS) -> Tuple[List[Dict], List[Dict]]:
+    """Formality and descriptiveness per section and per sliding window of
+    `window` words.
+
+    Each segment is a dict with its label, first word number, word count,
+    character span and scores. Every segment is scored from prefix sums of
+    the per-token features, so it costs the same however long it is.
+    """
+    tokens = index.tokens
+    word_count = len(tokens)
+    if word_count == 0:
+        return [], []
+    token_starts = np.fromiter((token.start for token in tokens), dtype=np.int64, count=word_count)
+    # Exclamation marks count towards the word before them
+    marks = np.array([match.start() for match in re.finditer('!', index.text)], dtype=np.int64)
+    owners = np.maximum(np.searchsorted(token_starts, marks, side='right') - 1, 0)
+    sums = _PrefixSums(features, np.bincount(owners, minlength=word_count))
+
+    def segment(label: str, first: int, last: int) -> Dict:
+        counts = sums.features(first, last)
+        return {
+            'label': label,
+            'first_word': first + 1,
+            'words': last - first,
+            'start': tokens[first].start,
+            'end': tokens[last - 1].end,
+            'formality': score_formality(counts),
+            'descriptiveness': score_descriptiveness(counts),
+        }
+
+    starts = _section_starts(index, token_starts, offsets)
+    sections = []
+    for number, (first, last) in enumerate(zip(starts, starts[1:] + [word_count]), start=1):
+        page = offsets.page_of(tokens[first].start) if offsets is not None else None
+        label = f"Section {number} (page {page})" if page else f"Section {number}"
+        sections.append(segment(label, first, last))
+
+    windows = [
+        segment(f"Words {first + 1}–{min(first + window, word_count)}", first, min(first + window, word_count))
+        for first in _window_starts(word_count, window)
+    ]
+    return sections, windows
+
+
+def score_descriptiveness(features: ToneFeatures) -> float:
+    """
+    Calculate descriptiveness score based on adjectives, adverbs, sensory language, and figurative language.
+    Returns a score between 0 and 100.
+    """
+    word_count = features.word_count
+    if word_count == 0:
+        return 0.0
+
+    # Calculate base descriptiveness from adjectives/adverbs per 100 words
+    base_descriptiveness = ((features.adjectives + features.adverbs) / word_count) * 100
+
+    # Add bonus for sensory/emotive language
+    sensory_bonus = (features.sensory / word_count) * 50
+
+    # Add bonus for figurative language
+    figurative_bonus = (features.similes / word_count) * 30
+
+    # Combine scores with diminishing returns
+    total_score = base_descriptiveness + sensory_bonus + figurative_bonus
+
+    # Apply scaling to make scores more intuitive
+    if total_score > 0:
+        # Use a more generous scaling that rewards descriptive writing
+        total_score = min(100, 30 * (1 + 2.5 * (total_score / 100) ** 0.6))
+
+    return max(0, min(100, total_score))
+
+
+def score_formality(features: ToneFeatures) -> float:
+    """
+    Calculate formality score based on contractions, informal vocabulary,
+    exclamations, pronouns, and formal language patterns.
+    Returns a score between 0 and 100.
+    """
+    word_count = features.word_count
+    if word_count == 0:
+        return 50.0
+
+    # Calculate penalty factors (higher = less formal)
+    contraction_penalty = (features.contractions / word_count) * 100
+    informal_penalty = (features.informal / word_count) * 80
+    interjection_penalty = (features.interjections / word_count) * 60
+    exclamation_penalty = (features.exclamations / word_count) * 40
+    pronoun_penalty = (features.pronouns / word_count) * 20
+
+    # Calculate reward factors (higher = more formal)
+    formal_reward = (features.formal / word_count) * 60
+
+    # Base formality score starts at 50 (neutral)
+    formality_score = 50.0
+
+    # Apply penalties
+    total_penalty = contraction_penalty + informal_penalty + interjection_penalty + exclamation_penalty + pronoun_penalty
+    formality_score -= total_penalty
+
+    # Apply rewards
+    formality_score += formal_reward
+
+    # Ensure score stays within bounds
+    return max(0, min(100, formality_score))
+
+
+def analyze_tone(text: str, index: TextIndex, offsets: Optional[OffsetMap] = None,
+                 window: int = DEFAULT_WINDOW_WORDS, tags: Optional[List[str]] = None,
+                 sentiment: Optional[float] = None) -> Dict:
+    """
+    Analyzes the tone of the text, using the scan's shared token index.
+
+    Besides the whole-document scores, 'sections' and 'windows' hold the
+    formality and descriptiveness of each section and of each `window`-word
+    stretch (see `tone_profile`). Without POS `tags`, descriptiveness only
+    counts metaphors and similes. `sentiment` is the score from
+    `sentiment.sentiment_score`, if it has already been worked out.
+    """
+    # If the input text is empty or just whitespace, return a zeroed-out dictionary.
+    if not text or not text.strip():
+        return {
+            'formality': 50.0, 'descriptiveness': 0.0, 'sentiment': 50.0,
+            'avg_sentence_length': 0.0, 'vocabulary_richness': 0.0,
+            'word_count': 0, 'sentence_count': 0
+        }
+
+    token_level = token_features(index, tags)
+    features = extract_features(index, token_level)
+    word_count = features.word_count
+    sentence_count = features.sentence_count
+
+    # If there are no words or sentences, we can't calculate ratios.
+    if word_count == 0 or sentence_count == 0:
+        return {
+            'formality': 50.0, 'descriptiveness': 0.0, 'sentiment': 50.0,
+            'avg_sentence_length': 0.0, 'vocabulary_richness': 0.0,
+            'word_count': word_count, 'sentence_count': sentence_count
+        }
+
+    # Sentiment score: lexicon polarity, scaled to 0-100.
+    if sentiment is None:
+        sentiment = sentiment_score(index)
+
+    sections, windows = tone_profile(index, token_level, offsets, window)
+
+    return {
+        'formality': score_formality(features),
+        'descriptiveness': score_descriptiveness(features),
+        'sentiment': sentiment,
+        'avg_sentence_length': word_count / sentence_count,
+        'vocabulary_richness': (features.unique_word_count / word_count) * 100,
+        'word_count': word_count,
+        'sentence_count': sentence_count,
+        'sections': sections,
+        'windows': windows,
+        'window_words': window
+    }